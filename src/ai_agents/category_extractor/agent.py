@@ -1,33 +1,182 @@
 """Main AI agent orchestrating category extraction."""
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
-
-from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+import asyncio
+from contextlib import suppress
+from functools import cached_property, lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Dict, Final, List, Mapping, Optional
 
 from .config import get_config
 from .database import CategoryDatabase
 from .errors import AnalysisError, BotDetectionError, ExtractorError, NavigationError
 from .utils.logger import get_logger
-from .blueprints.loader import load_blueprint
+from .blueprints.loader import compile_blueprint, load_blueprint
 from .blueprints.executor import execute_blueprint
 
-try:  # pragma: no cover - strands may be unavailable in test environment
-    from strands import Agent as StrandsAgent
-except ImportError:  # pragma: no cover
-    StrandsAgent = None  # type: ignore[misc]
+if TYPE_CHECKING:  # Playwright is imported on first browser launch
+    from playwright.async_api import Browser, BrowserContext, Page
+
+_LAUNCH_ARGS = (
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-blink-features=AutomationControlled",
+)
+
+# Injected into every context before page scripts run; add further stealth tweaks here.
+_STEALTH_INIT_JS: Final[str] = "Object.defineProperty(navigator,'webdriver',{get:()=>undefined});"
+
+_USER_AGENT: Final[str] = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+_SYSTEM_PROMPT: Final[str] = (
+    "You are an expert e-commerce scraping assistant. "
+    "Identify navigation patterns, extract hierarchical categories, "
+    "persist results, and generate reusable blueprints. "
+    "Use the registered tools, report confidence, and note blockers."
+)
+
+# Anthropic only caches prefixes that are explicitly marked; the cache point covers
+# the tool specs and system prompt reused on every turn of the tool loop.
+# OpenAI caches stable prefixes automatically, so the plain constant suffices there.
+# Content-block system prompts need strands-agents 1.15+.
+_CACHED_SYSTEM_PROMPT: Final[List[Dict[str, Any]]] = [
+    {"text": _SYSTEM_PROMPT},
+    {"cachePoint": {"type": "default"}},
+]
+
+_EXTRACT_PROMPT_TEMPLATE: Final[str] = (
+    "Extract hierarchical product categories from {site_url}. "
+    "Workflow: analyze_page -> extract_categories -> persist -> generate_blueprint. "
+    "Use retailer_id={retailer_id}. Return summary and confidence."
+)
+
+
+
+# Provider models wrap SDK clients and connection pools; build each distinct
+# configuration once per process and share it between agents.
+@lru_cache(maxsize=4)
+def _ollama_model(host: str, model_id: str, temperature: float, keep_alive: str) -> Any:
+    from strands.models.ollama import OllamaModel
+
+    return OllamaModel(
+        host=host,
+        model_id=model_id,
+        temperature=temperature,
+        keep_alive=keep_alive,
+        timeout=180.0,  # 3 minutes timeout for complex analysis
+    )
+
+
+@lru_cache(maxsize=4)
+def _openai_model(model_id: str, api_key: Optional[str], base_url: Optional[str], temperature: float) -> Any:
+    from strands.models.openai import OpenAIModel
+
+    return OpenAIModel(
+        model_id=model_id,
+        api_key=api_key,
+        base_url=base_url,
+        temperature=temperature,
+    )
+
+
+@lru_cache(maxsize=4)
+def _anthropic_model(model_id: str, api_key: Optional[str], temperature: float) -> Any:
+    from strands.models.anthropic import AnthropicModel
+
+    return AnthropicModel(
+        model_id=model_id,
+        api_key=api_key,
+        temperature=temperature,
+    )
+
+
+@lru_cache(maxsize=4)
+def _context_options(width: int, height: int) -> Mapping[str, Any]:
+    """BrowserContext keyword arguments, built once per viewport size."""
+    return MappingProxyType(
+        {
+            "viewport": {"width": width, "height": height},
+            "user_agent": _USER_AGENT,
+            "locale": "en-US",
+            "timezone_id": "Africa/Johannesburg",
+        }
+    )
+
+
+class BrowserPool:
+    """Process-wide Playwright + Chromium shared by every agent.
+
+    Launching Chromium dominates start-up cost, so agents only create their own
+    (cheap, isolated) BrowserContext on top of the pooled browser. Callers must
+    await ``BrowserPool.shutdown()`` before the event loop closes.
+    """
+
+    _playwright: Any = None
+    _browsers: Dict[bool, Browser] = {}
+    _lock: Optional[asyncio.Lock] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    async def get_browser(cls, headless: bool) -> Browser:
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            # Playwright objects are bound to the loop that created them
+            cls._playwright = None
+            cls._browsers = {}
+            cls._lock = asyncio.Lock()
+            cls._loop = loop
+
+        assert cls._lock is not None
+        async with cls._lock:
+            browser = cls._browsers.get(headless)
+            if browser is None or not browser.is_connected():
+                if cls._playwright is None:
+                    from playwright.async_api import async_playwright
+
+                    cls._playwright = await async_playwright().start()
+                browser = await cls._playwright.chromium.launch(headless=headless, args=list(_LAUNCH_ARGS))
+                cls._browsers[headless] = browser
+            return browser
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Close pooled browsers and stop Playwright."""
+        if cls._loop is not None and cls._loop is not asyncio.get_running_loop():
+            cls._playwright = None
+            cls._browsers = {}
+            return
+
+        browsers, cls._browsers = cls._browsers, {}
+        for browser in browsers.values():
+            with suppress(Exception):
+                await browser.close()
+        if cls._playwright is not None:
+            with suppress(Exception):
+                await cls._playwright.stop()
+            cls._playwright = None
 
 
 class CategoryExtractionAgent:
     """Coordinates browser automation, LLM tools, and persistence."""
 
-    def __init__(self, retailer_id: int, site_url: str, headless: Optional[bool] = None) -> None:
+    def __init__(
+        self,
+        retailer_id: int,
+        site_url: str,
+        headless: Optional[bool] = None,
+        ephemeral: bool = False,
+    ) -> None:
         self.retailer_id = retailer_id
         self.site_url = site_url
         self.config = get_config()
         self.headless = headless if headless is not None else self.config.browser_headless
+        # Ephemeral agents own a private browser instead of borrowing the pooled one
+        self.ephemeral = ephemeral
 
-        self.playwright = None
+        self._playwright: Any = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
@@ -42,69 +191,79 @@ class CategoryExtractionAgent:
             "errors": [],
         }
 
-        # Create tool instances
+    # Tools and the Strands agent are built on first use so blueprint-only runs
+    # never import strands or the provider SDKs.
+    @cached_property
+    def page_analyzer(self) -> Any:
         from .tools.page_analyzer import PageAnalyzerTool
+
+        return PageAnalyzerTool(self)
+
+    @cached_property
+    def category_extractor(self) -> Any:
         from .tools.category_extractor import CategoryExtractorTool
+
+        return CategoryExtractorTool(self)
+
+    @cached_property
+    def blueprint_generator(self) -> Any:
         from .tools.blueprint_generator import BlueprintGeneratorTool
 
-        self.page_analyzer = PageAnalyzerTool(self)
-        self.category_extractor = CategoryExtractorTool(self)
-        self.blueprint_generator = BlueprintGeneratorTool(self)
-        
-        # Create agent with tools
-        self.agent = self._create_strands_agent()
+        return BlueprintGeneratorTool(self)
+
+    @cached_property
+    def agent(self) -> Any:
+        return self._create_strands_agent()
 
     def _create_strands_agent(self) -> Any:
-        if StrandsAgent is None:
+        try:
+            from strands import Agent as StrandsAgent
+        except ImportError as exc:
             raise ImportError(
                 "Strands Agents SDK is required. Install strands-agents to use CategoryExtractionAgent."
-            )
+            ) from exc
         
         # Create agent based on configured provider
         provider = self.config.llm_provider.lower()
         
         if provider == "ollama":
-            from strands.models.ollama import OllamaModel
-            model = OllamaModel(
-                host=self.config.ollama_host,
-                model_id=self.config.ollama_model,
-                temperature=self.config.model_temperature,
-                keep_alive=self.config.ollama_keep_alive,
-                timeout=180.0,  # 3 minutes timeout for complex analysis
+            model = _ollama_model(
+                self.config.ollama_host,
+                self.config.ollama_model,
+                self.config.model_temperature,
+                self.config.ollama_keep_alive,
             )
             # Pass tools to Agent constructor (Strands 1.10+)
             return StrandsAgent(
                 model=model,
-                system_prompt=self._system_prompt(),
+                system_prompt=_SYSTEM_PROMPT,
                 tools=[self.page_analyzer.analyze, self.category_extractor.extract, self.blueprint_generator.generate]
             )
         
         elif provider == "openai":
-            from strands.models.openai import OpenAIModel
-            model = OpenAIModel(
-                model_id=self.config.openai_model,
-                api_key=self.config.openai_api_key,
-                base_url=self.config.openai_base_url,
-                temperature=self.config.model_temperature,
+            model = _openai_model(
+                self.config.openai_model,
+                self.config.openai_api_key,
+                self.config.openai_base_url,
+                self.config.model_temperature,
             )
             # Pass tools to Agent constructor (Strands 1.10+)
             return StrandsAgent(
                 model=model,
-                system_prompt=self._system_prompt(),
+                system_prompt=_SYSTEM_PROMPT,
                 tools=[self.page_analyzer.analyze, self.category_extractor.extract, self.blueprint_generator.generate]
             )
         
         elif provider == "anthropic":
-            from strands.models.anthropic import AnthropicModel
-            model = AnthropicModel(
-                model_id=self.config.anthropic_model,
-                api_key=self.config.anthropic_api_key,
-                temperature=self.config.model_temperature,
+            model = _anthropic_model(
+                self.config.anthropic_model,
+                self.config.anthropic_api_key,
+                self.config.model_temperature,
             )
             # Pass tools to Agent constructor (Strands 1.10+)
             return StrandsAgent(
                 model=model,
-                system_prompt=self._system_prompt(),
+                system_prompt=_CACHED_SYSTEM_PROMPT,
                 tools=[self.page_analyzer.analyze, self.category_extractor.extract, self.blueprint_generator.generate]
             )
         
@@ -113,61 +272,47 @@ class CategoryExtractionAgent:
             return StrandsAgent(
                 model_provider=provider,
                 model_id=self.config.model_id,
-                system_prompt=self._system_prompt(),
+                system_prompt=_SYSTEM_PROMPT,
                 tools=[self.page_analyzer.analyze, self.category_extractor.extract, self.blueprint_generator.generate]
             )
 
-    def _system_prompt(self) -> str:
-        return (
-            "You are an expert e-commerce scraping assistant. "
-            "Identify navigation patterns, extract hierarchical categories, "
-            "persist results, and generate reusable blueprints. "
-            "Use the registered tools, report confidence, and note blockers."
-        )
-
     async def initialize_browser(self) -> None:
-        if self.browser:
+        if self.page:
             self.logger.debug("Browser already initialised")
             return
 
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=self.headless,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                "--disable-blink-features=AutomationControlled",
-            ],
-        )
+        if self.ephemeral:
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+            self.browser = await self._playwright.chromium.launch(headless=self.headless, args=list(_LAUNCH_ARGS))
+        else:
+            self.browser = await BrowserPool.get_browser(self.headless)
         self.context = await self.browser.new_context(
-            viewport={"width": self.config.browser_width, "height": self.config.browser_height},
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            ),
-            locale="en-US",
-            timezone_id="Africa/Johannesburg",
+            **_context_options(self.config.browser_width, self.config.browser_height)
         )
-        await self.context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined,
-            });
-        """)
+        await self.context.add_init_script(_STEALTH_INIT_JS)
         self.page = await self.context.new_page()
         self.logger.info("Browser initialised for {}", self.site_url)
 
-    async def run_extraction(self) -> Dict[str, Any]:
-        prompt = (
-            f"Extract hierarchical product categories from {self.site_url}. "
-            "Workflow: analyze_page -> extract_categories -> persist -> generate_blueprint. "
-            f"Use retailer_id={self.retailer_id}. Return summary and confidence."
-        )
+    async def run_extraction(self, on_progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Run the LLM-driven workflow; ``on_progress`` receives stage updates as tools start."""
+        prompt = _EXTRACT_PROMPT_TEMPLATE.format(site_url=self.site_url, retailer_id=self.retailer_id)
 
         try:
-            await self.initialize_browser()
-            await self.db.connect()
+            # Browser launch, DB pool creation and model loading are independent I/O; overlap them.
+            # Let all three settle before raising so cleanup never races a half-built pool.
+            results = await asyncio.gather(
+                self.initialize_browser(),
+                self.db.connect(),
+                self.page_analyzer.warm_up(),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
             self.logger.info("Starting LLM-guided extraction")
-            result = await self.agent.arun(prompt)
+            result = await self._stream_agent(prompt, on_progress)
             self.state["stage"] = "completed"
             return {"success": True, "result": result, "state": self.state}
         except (NavigationError, AnalysisError, BotDetectionError) as exc:
@@ -184,10 +329,33 @@ class CategoryExtractionAgent:
         finally:
             await self.cleanup()
 
+    async def _stream_agent(self, prompt: str, on_progress: Optional[Callable[[str], None]]) -> Any:
+        """Consume the agent's event stream so tool progress is visible as it happens."""
+        stream = getattr(self.agent, "stream_async", None)
+        if stream is None:
+            return await self.agent.arun(prompt)
+
+        result: Any = None
+        text: List[str] = []
+        current_tool: Optional[str] = None
+        async for event in stream(prompt):
+            if "result" in event:
+                result = event["result"]
+            elif "data" in event:
+                text.append(event["data"])
+            tool_name = (event.get("current_tool_use") or {}).get("name")
+            if tool_name and tool_name != current_tool:
+                current_tool = tool_name
+                self.state["stage"] = tool_name
+                self.logger.info("Agent running tool {}", tool_name)
+                if on_progress:
+                    on_progress(f"Running {tool_name}...")
+        return result if result is not None else "".join(text)
+
     async def run_blueprint(self, blueprint_path: str) -> Dict[str, Any]:
         try:
             await self.initialize_browser()
-            blueprint = load_blueprint(blueprint_path)
+            blueprint = compile_blueprint(load_blueprint(blueprint_path))
             categories = await execute_blueprint(self.page, blueprint, self.site_url)
             self.state["categories"] = categories
             self.state["categories_found"] = len(categories)
@@ -206,48 +374,30 @@ class CategoryExtractionAgent:
         self.logger.error("Extraction error: {}", message)
 
     async def cleanup(self) -> None:
-        """Clean up resources in the correct order to avoid event loop errors."""
-        # Database cleanup first (doesn't rely on event loop)
-        try:
-            await self.db.disconnect()
-        except Exception as e:
-            self.logger.debug("DB disconnect error: {}", e)
-        
-        # Browser cleanup (must complete before event loop closes)
+        """Release the DB pool, page and context concurrently; shared browser and LLM clients stay pooled."""
+        closers = [self.db.disconnect()]
+        if self.page and not self.page.is_closed():
+            closers.append(self.page.close())
+        if self.context:
+            closers.append(self.context.close())
+
         try:
-            if self.page:
-                try:
-                    if not self.page.is_closed():
-                        await self.page.close()
-                except Exception:
-                    pass
-            
-            if self.context:
-                try:
-                    await self.context.close()
-                except Exception:
-                    pass
-            
-            if self.browser:
-                try:
-                    await self.browser.close()
-                except Exception:
-                    pass
-            
-            if self.playwright:
-                try:
-                    # Stop playwright BEFORE event loop closes
-                    await self.playwright.stop()
-                except Exception:
-                    pass
-        except Exception as e:
-            self.logger.debug("Cleanup error: {}", e)
+            results = await asyncio.gather(*closers, return_exceptions=True)
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                self.logger.debug("Cleanup errors: {}", errors)
+            if self._playwright is not None:
+                if self.browser:
+                    with suppress(Exception):
+                        await self.browser.close()
+                with suppress(Exception):
+                    await self._playwright.stop()
         finally:
             # Clear all references
             self.page = None
             self.context = None
             self.browser = None
-            self.playwright = None
+            self._playwright = None
 
 
-__all__ = ["CategoryExtractionAgent"]
+__all__ = ["BrowserPool", "CategoryExtractionAgent"]
@@ -1,73 +1,199 @@
 """Execute stored blueprints without invoking the LLM."""
 from __future__ import annotations
 
-from typing import Any, Dict, List
-
-from playwright.async_api import Page
+import re
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Mapping, Sequence, Set, Union
 
 from ..errors import BlueprintError
+from ..tools.blueprint_generator import BlueprintModel
 from ..utils.logger import get_logger
 from ..utils.url_utils import ensure_absolute, normalize_url
-
-
-async def execute_blueprint(page: Page, blueprint, base_url: str) -> List[Dict[str, Any]]:
+from .loader import CompiledBlueprint, compile_blueprint
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+# Runs consecutive click/wait/scroll steps in-page, waiting (like Playwright) until the
+# selector matches a visible element. Hover stays on the Playwright path since it needs
+# real mouse events.
+_BATCH_JS = """
+async (steps) => {
+  const visible = (selector) => {
+    const el = document.querySelector(selector);
+    if (!el) return null;
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden' ? el : null;
+  };
+  const waitFor = (selector, timeout) => new Promise((resolve, reject) => {
+    const found = visible(selector);
+    if (found) return resolve(found);
+    const check = () => {
+      const el = visible(selector);
+      if (el) {
+        observer.disconnect();
+        clearInterval(poll);
+        clearTimeout(timer);
+        resolve(el);
+      }
+    };
+    // Mutations catch inserted nodes; the poll catches CSS-only reveals such as transitions
+    const observer = new MutationObserver(check);
+    const poll = setInterval(check, 100);
+    const timer = setTimeout(() => {
+      observer.disconnect();
+      clearInterval(poll);
+      reject(new Error(`Timeout ${timeout}ms waiting for ${selector}`));
+    }, timeout);
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+  });
+  for (const step of steps) {
+    const timeout = step.timeout ?? 2000;
+    if (step.action === 'click') {
+      const el = await waitFor(step.target, timeout);
+      el.scrollIntoView({block: 'center'});
+      el.click();
+    } else if (step.action === 'wait') {
+      await new Promise((resolve) => setTimeout(resolve, step.duration ?? 500));
+    } else if (step.action === 'scroll') {
+      window.scrollTo(0, document.body.scrollHeight);
+    }
+    if (step.wait_for) await waitFor(step.wait_for, timeout);
+  }
+}
+"""
+_BATCHED_ACTIONS = frozenset({"click", "wait", "scroll"})
+# Playwright-only selector syntax (engine prefixes, XPath, chaining, text pseudo-classes)
+# that document.querySelector cannot parse
+_PLAYWRIGHT_SELECTOR_RE = re.compile(
+    r"^\s*(?:[a-z_-]+=|internal:|/|\(|\.\.|[\"'])"
+    r"|>>"
+    r"|:(?:has-text|text|text-is|text-matches|visible|nth-match|right-of|left-of|above|below|near)\b"
+)
+
+# Collect every link's text and href in one browser round-trip
+_LINKS_JS = "els => els.map(e => ({name: (e.innerText || '').trim(), href: e.getAttribute('href')}))"
+
+
+async def execute_blueprint(
+    page: Page,
+    blueprint: Union[CompiledBlueprint, BlueprintModel],
+    base_url: str,
+) -> List[Dict[str, Any]]:
     logger = get_logger()
+    if not isinstance(blueprint, CompiledBlueprint):
+        blueprint = compile_blueprint(blueprint)
     selectors = blueprint.selectors
     interactions = blueprint.interactions
 
-    await _perform_interactions(page, interactions, selectors, logger)
+    await _perform_interactions(page, interactions, logger)
     categories = await _extract_categories(page, selectors, base_url)
     return categories
 
 
-async def _perform_interactions(page: Page, interactions, selectors, logger) -> None:
+async def _hover(page: Page, step: Mapping[str, Any], target_selector: str, timeout: int) -> None:
+    element = await page.wait_for_selector(target_selector, timeout=timeout)
+    await element.hover()
+
+
+async def _click(page: Page, step: Mapping[str, Any], target_selector: str, timeout: int) -> None:
+    element = await page.wait_for_selector(target_selector, timeout=timeout)
+    await element.click()
+
+
+async def _wait(page: Page, step: Mapping[str, Any], target_selector: str, timeout: int) -> None:
+    await page.wait_for_timeout(step.get("duration", 500))
+
+
+async def _scroll(page: Page, step: Mapping[str, Any], target_selector: str, timeout: int) -> None:
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+
+
+_ACTION_HANDLERS: Dict[str, Callable[[Page, Mapping[str, Any], str, int], Awaitable[None]]] = {
+    "hover": _hover,
+    "click": _click,
+    "wait": _wait,
+    "scroll": _scroll,
+}
+
+
+async def _perform_interactions(page: Page, interactions: Sequence[Mapping[str, Any]], logger) -> None:
+    # Selector keys were resolved to concrete selectors by compile_blueprint()
+    batch: List[Mapping[str, Any]] = []
     for step in interactions:
-        action = step.get("action")
-        target_key = step.get("target")
-        target_selector = selectors.get(target_key, target_key)
-        wait_for = step.get("wait_for")
-        timeout = step.get("timeout", 2000)
-
-        if action == "hover":
-            element = await page.wait_for_selector(target_selector, timeout=timeout)
-            await element.hover()
-        elif action == "click":
-            element = await page.wait_for_selector(target_selector, timeout=timeout)
-            await element.click()
-        elif action == "wait":
-            await page.wait_for_timeout(step.get("duration", 500))
-        elif action == "scroll":
-            await page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
-        else:
-            logger.debug("Skipping unknown action {}", action)
-
-        if wait_for:
-            await page.wait_for_selector(selectors.get(wait_for, wait_for), timeout=timeout)
-
-
-async def _extract_categories(page: Page, selectors: Dict[str, Any], base_url: str) -> List[Dict[str, Any]]:
+        if _can_batch(step):
+            batch.append(step)
+            continue
+        await _flush_batch(page, batch, logger)
+        await _perform_step(page, step, logger)
+    await _flush_batch(page, batch, logger)
+
+
+def _can_batch(step: Mapping[str, Any]) -> bool:
+    """Only plain CSS steps run in-page; anything else needs Playwright's selector engine."""
+    if step.get("action") not in _BATCHED_ACTIONS:
+        return False
+    selectors = [step.get("wait_for")]
+    if step.get("action") == "click":
+        selectors.append(step.get("target"))
+    return all(
+        selector is None or (isinstance(selector, str) and not _PLAYWRIGHT_SELECTOR_RE.search(selector))
+        for selector in selectors
+    )
+
+
+async def _flush_batch(page: Page, batch: List[Mapping[str, Any]], logger) -> None:
+    """Run queued click/wait/scroll steps; two or more share a single evaluate round-trip."""
+    if len(batch) == 1:
+        await _perform_step(page, batch[0], logger)
+    elif batch:
+        await page.evaluate(_BATCH_JS, [dict(step) for step in batch])
+    batch.clear()
+
+
+async def _perform_step(page: Page, step: Mapping[str, Any], logger) -> None:
+    action = step.get("action")
+    wait_for = step.get("wait_for")
+    timeout = step.get("timeout", 2000)
+
+    handler = _ACTION_HANDLERS.get(action)
+    if handler is None:
+        logger.debug("Skipping unknown action {}", action)
+    else:
+        await handler(page, step, step.get("target"), timeout)
+
+    if wait_for:
+        await page.wait_for_selector(wait_for, timeout=timeout)
+
+
+async def _extract_categories(page: Page, selectors: Mapping[str, Any], base_url: str) -> List[Dict[str, Any]]:
     link_selector = selectors.get("category_links")
     if not link_selector:
         raise BlueprintError("Blueprint missing category_links selector")
 
-    elements = await page.query_selector_all(link_selector)
+    links = await page.eval_on_selector_all(link_selector, _LINKS_JS)
     categories: List[Dict[str, Any]] = []
-    for element in elements:
+    # Header, footer and mega-menu often repeat the same links
+    seen: Set[str] = set()
+    for link in links:
+        url = link.get("href")
+        if not url:
+            continue
         try:
-            name = (await element.inner_text()).strip()
-            url = await element.get_attribute("href")
-            if not url:
-                continue
-            categories.append(
-                {
-                    "name": name,
-                    "url": normalize_url(ensure_absolute(url, base_url)),
-                    "depth": 0,
-                    "parent_id": None,
-                }
-            )
-        except Exception:
+            url = normalize_url(ensure_absolute(url, base_url))
+        except ValueError:
+            # Malformed hrefs such as "http://[bad" are page noise, not failures.
+            continue
+        if url in seen:
             continue
+        seen.add(url)
+        categories.append(
+            {
+                "name": link.get("name", ""),
+                "url": url,
+                "depth": 0,
+                "parent_id": None,
+            }
+        )
 
     if not categories:
         raise BlueprintError("Blueprint execution returned no categories")
@@ -1,24 +1,35 @@
 """Blueprint loading utilities."""
 from __future__ import annotations
 
-import json
+from dataclasses import dataclass
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
 
+import orjson
 from pydantic import ValidationError
 
 from ..errors import BlueprintError
 from ..tools.blueprint_generator import BlueprintModel
 
 
+@dataclass(slots=True, frozen=True)
+class CompiledBlueprint:
+    """Read-only view of a validated blueprint used on the execution path."""
+
+    selectors: Mapping[str, Any]
+    interactions: Tuple[Mapping[str, Any], ...]
+
+
 def load_blueprint(path: str | Path) -> BlueprintModel:
     file_path = Path(path)
     if not file_path.exists():
         raise BlueprintError(f"Blueprint not found: {file_path}")
 
     try:
-        payload = json.loads(file_path.read_text(encoding="utf-8"))
+        payload = orjson.loads(file_path.read_bytes())
         blueprint = BlueprintModel.model_validate(payload)
-    except (OSError, json.JSONDecodeError) as exc:
+    except (OSError, orjson.JSONDecodeError) as exc:
         raise BlueprintError(f"Failed to read blueprint {path}: {exc}") from exc
     except ValidationError as exc:
         raise BlueprintError(f"Blueprint validation error: {exc}") from exc
@@ -29,4 +40,25 @@ def load_blueprint(path: str | Path) -> BlueprintModel:
     return blueprint
 
 
-__all__ = ["load_blueprint"]
+def _resolve_interaction_selectors(step: Mapping[str, Any], selectors: Mapping[str, Any]) -> Dict[str, Any]:
+    """Copy ``step`` with its ``target``/``wait_for`` selector keys replaced by concrete selectors."""
+    resolved = dict(step)
+    for field in ("target", "wait_for"):
+        value = resolved.get(field)
+        if value:
+            resolved[field] = selectors.get(value, value)
+    return resolved
+
+
+def compile_blueprint(blueprint: BlueprintModel) -> CompiledBlueprint:
+    """Freeze a validated blueprint with selector keys resolved; the model itself is left as saved."""
+    selectors = blueprint.selectors
+    return CompiledBlueprint(
+        selectors=MappingProxyType(dict(selectors)),
+        interactions=tuple(
+            MappingProxyType(_resolve_interaction_selectors(step, selectors)) for step in blueprint.interactions
+        ),
+    )
+
+
+__all__ = ["CompiledBlueprint", "compile_blueprint", "load_blueprint"]
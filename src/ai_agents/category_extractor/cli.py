@@ -4,17 +4,18 @@ from __future__ import annotations
 import asyncio
 import logging
 import sys
-from typing import Optional
+from typing import Callable, Optional
 
 import click
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
-from .agent import CategoryExtractionAgent
+from .agent import BrowserPool, CategoryExtractionAgent
 from .blueprints.executor import execute_blueprint
 from .blueprints.loader import load_blueprint
 from .errors import ExtractorError
+from .llm_client import shutdown_llm_clients
 
 console = Console()
 
@@ -39,6 +40,7 @@ def cli() -> None:
 @click.option("--force-refresh", is_flag=True, help="Force reload of initial page")
 @click.option("--blueprint-only", "--dry-run", is_flag=True, help="Generate blueprint/template only (don't save to database)")
 @click.option("--blueprint", type=click.Path(path_type=str), help="Existing blueprint path to run without LLM")
+@click.option("--no-cache", is_flag=True, help="Ignore cached page analyses and query the LLM")
 def extract_command(
     url: str,
     retailer_id: int,
@@ -46,6 +48,7 @@ def extract_command(
     force_refresh: bool,
     blueprint_only: bool,
     blueprint: Optional[str],
+    no_cache: bool,
 ) -> None:
     """Run the extraction workflow for a retailer.
     
@@ -53,16 +56,18 @@ def extract_command(
     This is useful when you just want the extraction strategy for your scraper.
     """
     try:
-        asyncio.run(
-            _run_extract(
-                url=url,
-                retailer_id=retailer_id,
-                headless=headless,
-                force_refresh=force_refresh,
-                blueprint_only=blueprint_only,
-                blueprint_path=blueprint,
+        with asyncio.Runner(loop_factory=_event_loop_factory()) as runner:
+            runner.run(
+                _run_extract(
+                    url=url,
+                    retailer_id=retailer_id,
+                    headless=headless,
+                    force_refresh=force_refresh,
+                    blueprint_only=blueprint_only,
+                    blueprint_path=blueprint,
+                    use_cache=not no_cache,
+                )
             )
-        )
     except KeyboardInterrupt:
         console.print("\n[red]Cancelled by user[/red]")
         sys.exit(130)
@@ -74,6 +79,15 @@ def extract_command(
         sys.exit(1)
 
 
+def _event_loop_factory() -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """Use uvloop's libuv-backed loop when installed (Linux/macOS); fall back to asyncio's."""
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+
 async def _run_extract(
     url: str,
     retailer_id: int,
@@ -81,6 +95,7 @@ async def _run_extract(
     force_refresh: bool,
     blueprint_only: bool,
     blueprint_path: Optional[str],
+    use_cache: bool = True,
 ) -> None:
     agent = CategoryExtractionAgent(retailer_id=retailer_id, site_url=url, headless=headless)
     
@@ -106,6 +121,8 @@ async def _run_extract(
                 progress.update(stage, description="Executing blueprint...")
                 categories = await execute_blueprint(agent.page, blueprint, url)
             else:
+                if not use_cache:
+                    agent.page_analyzer.cache = None
                 progress.update(stage, description="Analyzing navigation...")
                 analysis = await agent.page_analyzer.analyze(url, force_refresh)
                 console.print(f"[yellow]DEBUG: Analysis result: {analysis}[/yellow]")
@@ -129,6 +146,8 @@ async def _run_extract(
                 console.print(_success_panel(len(categories), blueprint_file, saved=True, save_stats=save_stats))
     finally:
         await agent.cleanup()
+        # Stop the shared browser and LLM connections before the runner closes the loop
+        await asyncio.gather(BrowserPool.shutdown(), shutdown_llm_clients())
 
 
 def _success_panel(total: int, blueprint_path: str, saved: bool, save_stats: Optional[dict] = None) -> Panel:
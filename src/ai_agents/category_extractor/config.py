@@ -1,12 +1,24 @@
 """Configuration management using Pydantic settings."""
 from __future__ import annotations
 
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import Field
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+_VALID_PROVIDERS = frozenset({"ollama", "openai", "anthropic", "openrouter"})
+_SENSITIVE_KEYS = frozenset({"db_password", "openai_api_key", "anthropic_api_key", "openrouter_api_key"})
+
+
+# Keyed on the fields rather than cached on the instance: model_copy() carries an
+# instance-level cache over to copies whose connection settings have changed.
+@lru_cache(maxsize=8)
+def _build_dsn(user: str, password: str, host: str, port: int, name: str) -> str:
+    return f"postgresql://{user}:{password}@{host}:{port}/{name}"
+
+
 class ExtractorConfig(BaseSettings):
     """Configuration for AI category extractor.
 
@@ -18,6 +30,8 @@ class ExtractorConfig(BaseSettings):
         env_file_encoding="utf-8",
         case_sensitive=False,
         extra="ignore",
+        # Shared process-wide via get_config(); use model_copy(update=...) for variants
+        frozen=True,
     )
 
     # Database configuration
@@ -26,20 +40,32 @@ class ExtractorConfig(BaseSettings):
     db_name: str = Field(default="products", description="Database name")
     db_user: str = Field(default="postgres", description="Database user")
     db_password: str = Field(default="", description="Database password")
+    db_batch_size: int = Field(
+        default=500,
+        ge=1,
+        description="Rows per upsert batch when saving categories",
+    )
+    db_save_concurrency: int = Field(
+        default=1,
+        ge=1,
+        le=10,
+        description="Pool connections used to save independent subtrees (1 = one transaction)",
+    )
 
     @property
     def database_url(self) -> str:
-        """Construct PostgreSQL DSN."""
-        return (
-            f"postgresql://{self.db_user}:{self.db_password}"
-            f"@{self.db_host}:{self.db_port}/{self.db_name}"
-        )
+        """Construct PostgreSQL DSN (built once per distinct set of connection settings)."""
+        return _build_dsn(self.db_user, self.db_password, self.db_host, self.db_port, self.db_name)
 
     # LLM Provider Configuration
     llm_provider: str = Field(
         default="ollama", 
         description="LLM provider: 'ollama', 'openai', 'anthropic', 'openrouter'"
     )
+    llm_race_providers: str = Field(
+        default="",
+        description="Comma-separated providers raced against llm_provider for page analysis",
+    )
     
     # OpenAI Configuration
     openai_api_key: Optional[str] = Field(default=None, description="OpenAI API key")
@@ -79,6 +105,21 @@ class ExtractorConfig(BaseSettings):
         le=200000,
         description="Maximum tokens per request",
     )
+    analyzer_model: Optional[str] = Field(
+        default=None,
+        description="Smaller provider model for simple page analyses (unset = use the main model)",
+    )
+    analyzer_max_html_chars: int = Field(
+        default=3000,
+        gt=0,
+        description="Pages whose prompt HTML (at most the first 4000 chars) fits in this many chars use analyzer_model",
+    )
+    llm_max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        le=64,
+        description="In-flight requests per LLM provider client",
+    )
 
     # Browser
     browser_headless: bool = Field(default=True, description="Headless browser flag")
@@ -98,8 +139,14 @@ class ExtractorConfig(BaseSettings):
         description="Directory for blueprints",
     )
 
+    # LLM response cache
+    llm_cache_enabled: bool = Field(default=True, description="Reuse cached page analyses")
+    llm_cache_ttl: int = Field(default=86400, ge=0, description="Analysis cache lifetime in seconds")
+
     # Logging
-    log_level: str = Field(default="INFO", description="Logging level")
+    log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = Field(
+        default="INFO", description="Logging level"
+    )
     log_file: Optional[str] = Field(
         default="logs/category_extractor.log",
         description="Log file path",
@@ -107,57 +154,58 @@ class ExtractorConfig(BaseSettings):
     log_rotation: str = Field(default="10 MB", description="Log file rotation size")
     log_retention: str = Field(default="30 days", description="Log retention policy")
 
+    @field_validator("log_level", mode="before")
+    @classmethod
+    def _normalise_log_level(cls, value: Any) -> Any:
+        return value.upper() if isinstance(value, str) else value
+
     def validate_config(self) -> None:
         """Validate required secrets and enumerations."""
         if not self.db_password:
             raise ValueError("DB_PASSWORD must be set in environment")
         
         # Validate LLM provider configuration
-        valid_providers = {"ollama", "openai", "anthropic", "openrouter"}
-        if self.llm_provider not in valid_providers:
-            raise ValueError(f"LLM_PROVIDER must be one of: {sorted(valid_providers)}")
+        if self.llm_provider not in _VALID_PROVIDERS:
+            raise ValueError(f"LLM_PROVIDER must be one of: {sorted(_VALID_PROVIDERS)}")
         
+        if not _VALID_PROVIDERS.issuperset(self.race_providers):
+            raise ValueError(f"LLM_RACE_PROVIDERS entries must be among: {sorted(_VALID_PROVIDERS)}")
+
         # Validate provider-specific credentials
-        if self.llm_provider == "openai" and not self.openai_api_key:
-            raise ValueError("OPENAI_API_KEY must be set when using OpenAI provider")
-        elif self.llm_provider == "anthropic" and not self.anthropic_api_key:
-            raise ValueError("ANTHROPIC_API_KEY must be set when using Anthropic provider")
-        elif self.llm_provider == "openrouter" and not self.openrouter_api_key:
-            raise ValueError("OPENROUTER_API_KEY must be set when using OpenRouter provider")
-        # Ollama doesn't require API keys
-        
-        valid_levels = {"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"}
-        if self.log_level.upper() not in valid_levels:
-            raise ValueError(f"LOG_LEVEL must be one of: {sorted(valid_levels)}")
+        for provider in (self.llm_provider, *self.race_providers):
+            if provider == "openai" and not self.openai_api_key:
+                raise ValueError("OPENAI_API_KEY must be set when using OpenAI provider")
+            elif provider == "anthropic" and not self.anthropic_api_key:
+                raise ValueError("ANTHROPIC_API_KEY must be set when using Anthropic provider")
+            elif provider == "openrouter" and not self.openrouter_api_key:
+                raise ValueError("OPENROUTER_API_KEY must be set when using OpenRouter provider")
+            # Ollama doesn't require API keys
+
+    @property
+    def race_providers(self) -> List[str]:
+        """Extra providers from ``llm_race_providers``, excluding the primary one."""
+        names = (name.strip().lower() for name in self.llm_race_providers.split(","))
+        return [name for name in dict.fromkeys(names) if name and name != self.llm_provider.lower()]
 
     def display_config(self) -> Dict[str, Optional[str]]:
         """Return config for display with sensitive values masked."""
-        data: Dict[str, Optional[str]] = self.model_dump()
-        sensitive_keys = (
-            "db_password", "openai_api_key", "anthropic_api_key", "openrouter_api_key"
-        )
-        for key in sensitive_keys:
-            if data.get(key):
-                data[key] = "***MASKED***"
-        return data
-
-
-_config: Optional[ExtractorConfig] = None
+        # Field values live in __dict__; no need for a full model_dump() serialisation pass
+        return {
+            key: "***MASKED***" if value and key in _SENSITIVE_KEYS else value
+            for key, value in self.__dict__.items()
+        }
 
 
+@lru_cache(maxsize=1)
 def get_config() -> ExtractorConfig:
     """Return singleton configuration instance."""
-    global _config
-    if _config is None:
-        _config = ExtractorConfig()
-    return _config
+    return ExtractorConfig()
 
 
 def reload_config() -> ExtractorConfig:
     """Reload configuration from environment (useful in tests)."""
-    global _config
-    _config = ExtractorConfig()
-    return _config
+    get_config.cache_clear()
+    return get_config()
 
 
 __all__ = ["ExtractorConfig", "get_config", "reload_config"]
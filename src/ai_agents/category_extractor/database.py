@@ -1,15 +1,77 @@
 """Database operations for AI category extractor."""
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+import asyncio
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Mapping, Optional
 
-import asyncpg
+import orjson
 
 from .config import get_config
 from .errors import DatabaseError
 from .utils.logger import get_logger
 
+if TYPE_CHECKING:  # asyncpg is imported on first connect
+    import asyncpg
+
+
+_UPSERT_CATEGORIES_SQL = """
+INSERT INTO categories (
+    name, url, parent_id, retailer_id, depth, enabled, created_at
+)
+SELECT name, url, parent_id, $4, $5, TRUE, now()
+FROM unnest($1::text[], $2::text[], $3::int[]) AS new(name, url, parent_id)
+ON CONFLICT (url, retailer_id) DO UPDATE
+SET name = EXCLUDED.name,
+    parent_id = EXCLUDED.parent_id,
+    depth = EXCLUDED.depth,
+    enabled = TRUE
+RETURNING id, url, (xmax = 0) AS inserted
+"""
+
+_RETAILER_HAS_CATEGORIES_SQL = "SELECT EXISTS (SELECT 1 FROM categories WHERE retailer_id = $1)"
+_COPIED_IDS_SQL = "SELECT id, url FROM categories WHERE retailer_id = $1 AND url = ANY($2::text[])"
+_COPY_COLUMNS = ("name", "url", "parent_id", "retailer_id", "depth", "enabled")
+# Below this many rows a single upsert round trip beats COPY plus the id lookup
+_COPY_MIN_ROWS = 200
+
+_CATEGORIES_SQL = (
+    "SELECT id, name, url, parent_id, depth, enabled, created_at "
+    "FROM categories WHERE retailer_id = $1 {filter}ORDER BY depth, name"
+)
+_ALL_CATEGORIES_SQL = _CATEGORIES_SQL.format(filter="")
+_ENABLED_CATEGORIES_SQL = _CATEGORIES_SQL.format(filter="AND enabled = true ")
+
+
+def _categories_query(enabled_only: bool) -> str:
+    return _ENABLED_CATEGORIES_SQL if enabled_only else _ALL_CATEGORIES_SQL
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    # Binary jsonb is a version byte followed by the JSON text
+    return b"\x01" + orjson.dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return orjson.loads(data[1:])
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Serialise json/jsonb columns with orjson instead of the stdlib json module."""
+    await conn.set_type_codec(
+        "jsonb", encoder=_encode_jsonb, decoder=_decode_jsonb, schema="pg_catalog", format="binary"
+    )
+    await conn.set_type_codec(
+        "json", encoder=lambda value: orjson.dumps(value).decode(), decoder=orjson.loads, schema="pg_catalog"
+    )
+
+
+def _mark_failed(batch: Dict[str, Dict[str, Any]], id_map: Dict[Any, Optional[int]]) -> None:
+    """Record a failed batch's local ids as None so their descendants are skipped, not orphaned."""
+    for row in batch.values():
+        for local_id in row["local_ids"]:
+            id_map.setdefault(local_id, None)
+
 
 class CategoryDatabase:
     """Manage PostgreSQL interactions for category data."""
@@ -17,13 +79,52 @@ class CategoryDatabase:
     def __init__(self) -> None:
         self.config = get_config()
         self.pool: Optional[asyncpg.Pool] = None
+        # Pending while the pool is being created so concurrent callers do not open a second one
+        self._ready: Optional[asyncio.Future] = None
+        # Held outside the pool so frequent health checks never queue behind real work
+        self._probe_conn: Optional[asyncpg.Connection] = None
+        # One connection runs one query at a time, so concurrent probes take turns
+        self._probe_lock = asyncio.Lock()
         self.logger = get_logger()
 
+    def _connection_kwargs(self) -> Dict[str, Any]:
+        return {
+            "host": self.config.db_host,
+            "port": self.config.db_port,
+            "database": self.config.db_name,
+            "user": self.config.db_user,
+            "password": self.config.db_password,
+            "command_timeout": 60,
+            "server_settings": {
+                "application_name": "ai_category_extractor",
+                # Short OLTP queries never amortise JIT compilation
+                "jit": "off",
+            },
+        }
+
     async def connect(self) -> None:
-        """Create asyncpg connection pool."""
+        """Create asyncpg connection pool; concurrent callers share a single attempt."""
         if self.pool is not None:
-            self.logger.debug("Database pool already initialised")
             return
+        if self._ready is not None:
+            await self._ready
+            return
+
+        ready = self._ready = asyncio.get_running_loop().create_future()
+        try:
+            self.pool = await self._create_pool()
+        except BaseException as exc:
+            ready.set_exception(exc)
+            ready.exception()  # waiters re-raise it; never warn about it going unretrieved
+            raise
+        else:
+            ready.set_result(None)
+        finally:
+            self._ready = None
+
+    async def _create_pool(self) -> asyncpg.Pool:
+        import asyncpg
+
         try:
             self.logger.info(
                 "Connecting to database {}:{}/{}",
@@ -31,27 +132,23 @@ class CategoryDatabase:
                 self.config.db_port,
                 self.config.db_name,
             )
-            self.pool = await asyncpg.create_pool(
-                host=self.config.db_host,
-                port=self.config.db_port,
-                database=self.config.db_name,
-                user=self.config.db_user,
-                password=self.config.db_password,
-                min_size=2,
-                max_size=10,
-                command_timeout=60,
-                server_settings={"application_name": "ai_category_extractor"},
+            pool = await asyncpg.create_pool(
+                min_size=2, max_size=10, init=_init_connection, **self._connection_kwargs()
             )
-            async with self.pool.acquire() as conn:
+            async with pool.acquire() as conn:
                 version = await conn.fetchval("SELECT version()")
                 self.logger.info("Connected to PostgreSQL: {}", version.split()[0])
+            return pool
         except asyncpg.PostgresError as exc:  # pragma: no cover - connection failure
             raise DatabaseError(f"Failed to connect to database: {exc}") from exc
         except Exception as exc:  # noqa: BLE001  # pragma: no cover
             raise DatabaseError(f"Unexpected error connecting to database: {exc}") from exc
 
     async def disconnect(self) -> None:
-        """Close existing connection pool."""
+        """Close existing connection pool and health-check connection."""
+        if self._probe_conn is not None:
+            await self._probe_conn.close()
+            self._probe_conn = None
         if self.pool is None:
             return
         await self.pool.close()
@@ -72,75 +169,31 @@ class CategoryDatabase:
         assert self.pool is not None  # for type checkers
 
         stats = {"saved": 0, "updated": 0, "skipped": 0, "errors": 0}
-        id_map: Dict[Any, int] = {}
-        sorted_categories = sorted(categories, key=lambda cat: cat.get("depth", 0))
+        # local id -> database id; None marks categories that could not be saved
+        id_map: Dict[Any, Optional[int]] = {}
+        # Bucket by depth in one pass; depth is small and bounded, so no full sort is needed
+        levels: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for category in categories:
+            levels[category.get("depth", 0)].append(category)
         logger = self.logger.bind(retailer_id=retailer_id)
-        logger.info("Saving {} categories for retailer {}", len(sorted_categories), retailer_id)
+        logger.info("Saving {} categories for retailer {}", len(categories), retailer_id)
 
-        async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                for category in sorted_categories:
-                    try:
-                        name = category["name"]
-                        url = category.get("url")
-                        if not url:
-                            stats["skipped"] += 1
-                            logger.warning("Skipping category without URL: {}", name)
-                            continue
-
-                        local_parent_id = category.get("parent_id")
-                        db_parent_id = id_map.get(local_parent_id) if local_parent_id is not None else None
-
-                        existing = await conn.fetchrow(
-                            "SELECT id FROM categories WHERE url = $1 AND retailer_id = $2",
-                            url,
-                            retailer_id,
-                        )
-                        if existing:
-                            await conn.execute(
-                                """
-                                UPDATE categories
-                                SET name = $1,
-                                    parent_id = $2,
-                                    depth = $3,
-                                    enabled = $4
-                                WHERE id = $5
-                                """,
-                                name,
-                                db_parent_id,
-                                category.get("depth", 0),
-                                True,
-                                existing["id"],
-                            )
-                            id_map[category.get("id")] = existing["id"]
-                            stats["updated"] += 1
-                            logger.debug("Updated category {} ({})", name, existing["id"])
-                        else:
-                            inserted = await conn.fetchrow(
-                                """
-                                INSERT INTO categories (
-                                    name, url, parent_id, retailer_id, depth, enabled, created_at
-                                )
-                                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                                RETURNING id
-                                """,
-                                name,
-                                url,
-                                db_parent_id,
-                                retailer_id,
-                                category.get("depth", 0),
-                                True,
-                                datetime.now(timezone.utc),
-                            )
-                            id_map[category.get("id")] = inserted["id"]
-                            stats["saved"] += 1
-                            logger.debug("Inserted category {} ({})", name, inserted["id"])
-                    except asyncpg.PostgresError as exc:
-                        stats["errors"] += 1
-                        logger.error("Database error saving category '{}': {}", category.get("name"), exc)
-                    except Exception as exc:  # noqa: BLE001
-                        stats["errors"] += 1
-                        logger.error("Unexpected error saving category '{}': {}", category.get("name"), exc)
+        concurrency = self.config.db_save_concurrency
+        if concurrency <= 1 or len(levels) < 2:
+            await self._save_levels(levels, retailer_id, id_map, stats, logger)
+        else:
+            # Roots commit first; each root's subtree then only depends on its own rows
+            root_depth = min(levels)
+            roots = levels.pop(root_depth)
+            await self._save_levels({root_depth: roots}, retailer_id, id_map, stats, logger)
+            subtrees = self._partition_by_root(levels, roots)
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def save_subtree(subtree: Dict[int, List[Dict[str, Any]]]) -> None:
+                async with semaphore:
+                    await self._save_levels(subtree, retailer_id, id_map, stats, logger)
+
+            await asyncio.gather(*(save_subtree(subtree) for subtree in subtrees))
         logger.info(
             "Save complete: saved={} updated={} skipped={} errors={}",
             stats["saved"],
@@ -150,6 +203,194 @@ class CategoryDatabase:
         )
         return stats
 
+    async def _save_levels(
+        self,
+        levels: Dict[int, List[Dict[str, Any]]],
+        retailer_id: int,
+        id_map: Dict[Any, Optional[int]],
+        stats: Dict[str, int],
+        logger: Any,
+    ) -> None:
+        """Save the given depth levels in one transaction on one pooled connection."""
+        assert self.pool is not None
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Parsed and planned once, then bound for every depth and batch
+                upsert = await conn.prepare(_UPSERT_CATEGORIES_SQL)
+                # A retailer without rows cannot conflict, so large levels may be bulk copied;
+                # ``written`` then tracks urls already stored so repeats still go through the upsert
+                fresh = not await conn.fetchval(_RETAILER_HAS_CATEGORIES_SQL, retailer_id)
+                written: Optional[set] = set() if fresh else None
+                # Parents sit one level up, so each depth only needs ids from earlier levels
+                for depth in sorted(levels):
+                    await self._save_level(
+                        conn, upsert, levels[depth], depth, retailer_id, id_map, stats, logger, written
+                    )
+
+    @staticmethod
+    def _partition_by_root(
+        levels: Dict[int, List[Dict[str, Any]]], roots: List[Dict[str, Any]]
+    ) -> List[Dict[int, List[Dict[str, Any]]]]:
+        """Split non-root levels into one depth->categories map per root they descend from.
+
+        Categories whose ancestry does not lead to a root share a single extra partition.
+        """
+        root_ids = {category.get("id") for category in roots}
+        root_of: Dict[Any, Any] = {}
+        partitions: Dict[Any, Dict[int, List[Dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+        for depth in sorted(levels):
+            for category in levels[depth]:
+                parent = category.get("parent_id")
+                if parent in root_ids:
+                    root = parent
+                else:
+                    root = root_of.get(parent) if parent is not None else None
+                root_of[category.get("id")] = root
+                partitions[root][depth].append(category)
+        return list(partitions.values())
+
+    async def _save_level(
+        self,
+        conn: asyncpg.Connection,
+        upsert: asyncpg.prepared_stmt.PreparedStatement,
+        level: List[Dict[str, Any]],
+        depth: int,
+        retailer_id: int,
+        id_map: Dict[Any, Optional[int]],
+        stats: Dict[str, int],
+        logger: Any,
+        written: Optional[set] = None,
+    ) -> None:
+        """Upsert one depth level with one statement per batch, copying large fresh batches."""
+        # url -> pending row; an upsert may not touch the same row twice, so duplicates share it
+        pending: Dict[str, Dict[str, Any]] = {}
+        for category in level:
+            try:
+                name = category["name"]
+                url = category.get("url")
+                if not url:
+                    stats["skipped"] += 1
+                    logger.warning("Skipping category without URL: {}", name)
+                    continue
+
+                duplicate = pending.get(url)
+                if duplicate is not None:
+                    duplicate["local_ids"].append(category.get("id"))
+                    stats["skipped"] += 1
+                    logger.debug("Skipping duplicate category URL {}", url)
+                    continue
+
+                local_parent_id = category.get("parent_id")
+                db_parent_id = id_map.get(local_parent_id) if local_parent_id is not None else None
+                if local_parent_id is not None and db_parent_id is None and local_parent_id in id_map:
+                    # Parent batch failed; saving now would turn the child into an orphaned root
+                    id_map[category.get("id")] = None
+                    stats["errors"] += 1
+                    logger.warning("Skipping category '{}' whose parent was not saved", name)
+                    continue
+                pending[url] = {"name": name, "parent_id": db_parent_id, "local_ids": [category.get("id")]}
+            except Exception as exc:  # noqa: BLE001
+                stats["errors"] += 1
+                logger.error("Unexpected error saving category '{}': {}", category.get("name"), exc)
+
+        urls = list(pending)
+        batch_size = self.config.db_batch_size
+        for start in range(0, len(urls), batch_size):
+            batch = {url: pending[url] for url in urls[start : start + batch_size]}
+            if written is None:
+                await self._upsert_batch(conn, upsert, batch, depth, retailer_id, id_map, stats, logger)
+                continue
+
+            repeats = {url: row for url, row in batch.items() if url in written}
+            unseen = {url: row for url, row in batch.items() if url not in written}
+            if len(unseen) >= _COPY_MIN_ROWS:
+                await self._copy_batch(conn, unseen, depth, retailer_id, id_map, stats, logger)
+            else:
+                repeats.update(unseen)
+            if repeats:
+                await self._upsert_batch(conn, upsert, repeats, depth, retailer_id, id_map, stats, logger)
+            written.update(batch)
+
+    async def _copy_batch(
+        self,
+        conn: asyncpg.Connection,
+        batch: Dict[str, Dict[str, Any]],
+        depth: int,
+        retailer_id: int,
+        id_map: Dict[Any, Optional[int]],
+        stats: Dict[str, int],
+        logger: Any,
+    ) -> None:
+        """Bulk load new categories of one depth with COPY and map their ids back.
+
+        Only valid while none of the urls exist for the retailer. ``created_at`` is left to the
+        column default of the shared categories schema. Runs in a savepoint like the upsert.
+        """
+        import asyncpg
+
+        try:
+            async with conn.transaction():
+                await conn.copy_records_to_table(
+                    "categories",
+                    records=[
+                        (row["name"], url, row["parent_id"], retailer_id, depth, True)
+                        for url, row in batch.items()
+                    ],
+                    columns=_COPY_COLUMNS,
+                )
+                rows = await conn.fetch(_COPIED_IDS_SQL, retailer_id, list(batch))
+        except asyncpg.PostgresError as exc:
+            stats["errors"] += len(batch)
+            logger.error("Database error copying {} categories: {}", len(batch), exc)
+            _mark_failed(batch, id_map)
+            return
+
+        for row in rows:
+            stats["saved"] += 1
+            for local_id in batch[row["url"]]["local_ids"]:
+                id_map[local_id] = row["id"]
+        logger.debug("Copied {} categories at depth {}", len(rows), depth)
+
+    async def _upsert_batch(
+        self,
+        conn: asyncpg.Connection,
+        upsert: asyncpg.prepared_stmt.PreparedStatement,
+        batch: Dict[str, Dict[str, Any]],
+        depth: int,
+        retailer_id: int,
+        id_map: Dict[Any, Optional[int]],
+        stats: Dict[str, int],
+        logger: Any,
+    ) -> None:
+        """Insert or update categories of one depth in a single statement and map their ids back.
+
+        Relies on the ``UNIQUE (url, retailer_id)`` constraint of the shared categories schema.
+        ``xmax = 0`` only holds for freshly inserted rows, which separates saved from updated.
+        Runs in a savepoint so a failed batch is rolled back alone and the save carries on.
+        """
+        import asyncpg
+
+        try:
+            async with conn.transaction():
+                rows = await upsert.fetch(
+                    [row["name"] for row in batch.values()],
+                    list(batch),
+                    [row["parent_id"] for row in batch.values()],
+                    retailer_id,
+                    depth,
+                )
+        except asyncpg.PostgresError as exc:
+            stats["errors"] += len(batch)
+            logger.error("Database error saving {} categories: {}", len(batch), exc)
+            _mark_failed(batch, id_map)
+            return
+
+        for row in rows:
+            stats["saved" if row["inserted"] else "updated"] += 1
+            for local_id in batch[row["url"]]["local_ids"]:
+                id_map[local_id] = row["id"]
+        logger.debug("Upserted {} categories at depth {}", len(rows), depth)
+
     async def get_retailer_info(self, retailer_id: int) -> Optional[Dict[str, Any]]:
         """Retrieve retailer information."""
         await self.connect()
@@ -165,24 +406,32 @@ class CategoryDatabase:
                 self.logger.warning("Retailer {} not found in database", retailer_id)
             return result
 
-    async def get_categories_by_retailer(self, retailer_id: int, enabled_only: bool = True) -> List[Dict[str, Any]]:
-        """Return categories for a retailer."""
+    async def get_categories_by_retailer(
+        self, retailer_id: int, enabled_only: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Return categories for a retailer.
+
+        Prefer ``iter_categories`` for large retailers; it streams raw records instead.
+        """
         await self.connect()
         assert self.pool is not None
 
-        query = [
-            "SELECT id, name, url, parent_id, depth, enabled, created_at",
-            "FROM categories",
-            "WHERE retailer_id = $1",
-        ]
-        if enabled_only:
-            query.append("AND enabled = true")
-        query.append("ORDER BY depth, name")
-        sql = " ".join(query)
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(_categories_query(enabled_only), retailer_id)
+        return [dict(row) for row in rows]
+
+    async def iter_categories(
+        self, retailer_id: int, enabled_only: bool = True, prefetch: int = 1000
+    ) -> AsyncIterator[Mapping[str, Any]]:
+        """Stream a retailer's categories through a server-side cursor, ``prefetch`` rows at a time."""
+        await self.connect()
+        assert self.pool is not None
 
         async with self.pool.acquire() as conn:
-            rows = await conn.fetch(sql, retailer_id)
-            return [dict(row) for row in rows]
+            # Cursors only live inside a transaction
+            async with conn.transaction():
+                async for row in conn.cursor(_categories_query(enabled_only), retailer_id, prefetch=prefetch):
+                    yield row
 
     async def delete_categories_by_retailer(self, retailer_id: int) -> int:
         """Delete categories for a retailer (used in tests)."""
@@ -196,12 +445,14 @@ class CategoryDatabase:
         return count
 
     async def health_check(self) -> bool:
-        """Simple health check to verify connectivity."""
+        """Simple health check to verify connectivity (one round-trip once the probe is open)."""
         try:
-            await self.connect()
-            assert self.pool is not None
-            async with self.pool.acquire() as conn:
-                await conn.fetchval("SELECT 1")
+            async with self._probe_lock:
+                if self._probe_conn is None or self._probe_conn.is_closed():
+                    import asyncpg
+
+                    self._probe_conn = await asyncpg.connect(**self._connection_kwargs())
+                await self._probe_conn.fetchval("SELECT 1")
             return True
         except Exception as exc:  # noqa: BLE001
             self.logger.error("Database health check failed: {}", exc)
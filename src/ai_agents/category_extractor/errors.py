@@ -5,34 +5,50 @@ from __future__ import annotations
 class ExtractorError(Exception):
     """Base exception for extractor errors."""
 
+    __slots__ = ()
+
 
 class NavigationError(ExtractorError):
     """Raised when page navigation fails."""
 
+    __slots__ = ()
+
 
 class AnalysisError(ExtractorError):
     """Raised when LLM-driven analysis fails."""
 
+    __slots__ = ()
+
 
 class ExtractionError(ExtractorError):
     """Raised when category harvesting fails."""
 
+    __slots__ = ()
+
 
 class DatabaseError(ExtractorError):
     """Raised during database operations."""
 
+    __slots__ = ()
+
 
 class BotDetectionError(ExtractorError):
     """Raised when the retailer blocks automation or shows CAPTCHA."""
 
+    __slots__ = ()
+
 
 class ValidationError(ExtractorError):
     """Raised when data validation fails."""
 
+    __slots__ = ()
+
 
 class BlueprintError(ExtractorError):
     """Raised when blueprint generation or execution fails."""
 
+    __slots__ = ()
+
 
 __all__ = [
     "ExtractorError",
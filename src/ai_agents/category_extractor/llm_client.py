@@ -1,30 +1,375 @@
 """LLM client supporting multiple providers (OpenAI, Anthropic, Ollama, OpenRouter)."""
 from __future__ import annotations
 
+import asyncio
 import base64
-import json
+import copy
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from collections import Counter
+from datetime import datetime, timezone
+from functools import cached_property, lru_cache
+from typing import Any, AsyncIterator, Dict, Final, List, Optional, Tuple, Union
+
+import httpx
+import orjson
+import tenacity
 
 from .config import get_config
 from .errors import AnalysisError
+from .utils.logger import log as logger
+
+try:  # SIMD base64 from the optional "speed" extra
+    from pybase64 import b64encode_as_string as _b64encode
+except ImportError:
+
+    def _b64encode(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii")
+
+
+# Ollama bodies are serialised with orjson and sent as raw content
+_JSON_HEADERS: Final[Dict[str, str]] = {"Content-Type": "application/json"}
+# Longest silence tolerated between streamed Ollama chunks, prompt evaluation included
+_OLLAMA_CHUNK_TIMEOUT: Final[float] = 60.0
+# Only this much of the simplified HTML reaches the model
+PROMPT_HTML_CHARS: Final[int] = 4000
+_JSON_BLOCK_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+# [epoch second, ISO string] of the last formatted analysis timestamp
+_timestamp_cache: List[Any] = [0, ""]
+
+# Sent as the system message of every request so providers can reuse it from their prompt cache
+_PROMPT_PREFIX: Final[str] = (
+    "You are an expert DOM analyst helping a Python scraping agent detect PRODUCT TAXONOMY on an e-commerce site.\n"
+    "Return ONLY valid JSON (UTF-8, no comments, no trailing commas). Do NOT include any explanation outside JSON.\n\n"
+    "## CRITICAL UNDERSTANDING\n"
+    "E-commerce sites organize products into hierarchies. These are NOT called 'categories' on every site.\n"
+    "Common names: Categories, Departments, Collections, Ranges, Shop By, Browse, Product Types, Sections.\n"
+    "Your job: Find the PRIMARY PRODUCT ORGANIZATION STRUCTURE - how products are grouped for browsing.\n\n"
+    "## GOAL\n"
+    "Identify how the site organizes products into browsable groups (taxonomy/hierarchy).\n"
+    "Produce REAL CSS selectors present in the HTML below, plus minimal interaction steps if menus are hidden.\n\n"
+    "## HARD REQUIREMENTS\n"
+    "1) Use ONLY classes/ids/structures that appear in the provided HTML. Do NOT invent selectors.\n"
+    "2) Prefer stable anchors: landmark tags (nav, header, aside), ARIA roles (role='navigation'|'menu'|'tree'), data-* attributes.\n"
+    "3) Provide 1–3 candidate 'nav models' (different plausible patterns). Rank by confidence.\n"
+    "4) Include tiny evidence samples (innerText of 1–5 matched links) so a human can verify quickly.\n"
+    "5) If categories are absent/hidden in this snippet, return empty selectors and a fallback plan.\n\n"
+    "## WHAT TO LOOK FOR\n"
+    "- Top navigation: <nav>, <header>, mega menus, hover menus, <ul>/<li> lists, role='menubar'.\n"
+    "- Sidebars: <aside>, .sidebar, .filters, .categories, facets trees, accordion sections.\n"
+    "- Dropdown/accordion/flyout panels: elements toggled by buttons with aria-expanded, aria-controls, data-toggle, etc.\n"
+    "- Breadcrumb/JSON-LD hints: breadcrumb lists or ItemList that reveal taxonomy terms.\n"
+    "- Text clues: 'Departments', 'Collections', 'Ranges', 'Shop', 'Shop by', 'Browse', 'All Products', 'Product Types'.\n"
+    "- Link patterns: URLs containing /category/, /c/, /dept/, /collection/, /shop/, /browse/.\n\n"
+    "## DISTINGUISH PRODUCTS FROM CATEGORIES\n"
+    "❌ WRONG: Individual product names (e.g., 'Paracetamol 500mg', 'Dove Soap', 'Samsung Phone')\n"
+    "✅ CORRECT: Product groups (e.g., 'Health & Pharmacy', 'Beauty', 'Electronics')\n"
+    "❌ WRONG: .product-item, .product-card, .product-list\n"
+    "✅ CORRECT: .category-item, .department-link, .nav-item, .menu-link\n\n"
+    "## NOISE TO AVOID (exclude via link filters)\n"
+    "- Account, Login, Register, Cart, Basket, Wishlist, Help/FAQ, Contact, Blog, Checkout, Search, Language, Currency.\n"
+    "- Very generic footers that are not category trees.\n\n"
+    "## OUTPUT (STRICT JSON)\n"
+    "{\n"
+    '  "url": "<echo URL>",\n'
+    '  "html_truncated": true|false,\n'
+    '  "nav_models": [\n'
+    "    {\n"
+    '      "navigation_type": "top_nav|sidebar|dropdown|accordion|hover_menu|filter_sidebar|breadcrumbs|unknown",\n'
+    '      "selectors": {\n'
+    '        "nav_container": "REAL CSS selector for container",\n'
+    '        "category_links": "REAL CSS selector for category anchors",\n'
+    '        "top_level_items": "selector for top-level li/div nodes or anchors",\n'
+    '        "flyout_panel": "selector for flyout/dropdown panels or null",\n'
+    '        "subcategory_list": "selector for subcategory lists or null"\n'
+    "      },\n"
+    '      "interactions": [\n'
+    '        {"type": "hover|click", "target": "selector", "wait_for": "selector to appear or null"}\n'
+    "      ],\n"
+    '      "link_filters": {\n'
+    '        "include_href_patterns": ["regex or substring patterns like \\"/category\\", \\"/c/\\""],\n'
+    '        "exclude_href_patterns": ["account|login|register|cart|wishlist|help|faq|contact|checkout|search|language|currency"]\n'
+    "      },\n"
+    '      "evidence": {\n'
+    '        "sample_text": ["up to 5 innerText samples e.g. \\"Women\\", \\"Men\\", \\"Kids\\", \\"Sale\\""],\n'
+    '        "counts": {"category_links": 0, "top_level_items": 0}\n'
+    "      },\n"
+    '      "confidence": 0.0\n'
+    "    }\n"
+    "  ],\n"
+    '  "best_index": 0,\n'
+    '  "fallback_plan": [\n'
+    '    "If no categories found: try sitemap.xml for /category/ or /collections/, check JSON-LD ItemList, or scan <footer> with stricter include filters."\n'
+    "  ],\n"
+    '  "notes": ["brief reasoning on why the best model was chosen"]\n'
+    "}\n\n"
+    "## VALIDATION RULES\n"
+    "- Every selector MUST match something that exists in the provided HTML.\n"
+    "- Arrays may be empty if unknown; use empty arrays [] rather than null.\n"
+    "- confidence in [0.0, 1.0]. best_index is the index of the strongest candidate in nav_models.\n\n"
+)
+
+
+def _image_media_type(screenshot: bytes) -> str:
+    """Screenshots are JPEG, except the PNG placeholder used when capture fails."""
+    # Slice comparison also accepts a memoryview over the capture buffer
+    return "image/png" if screenshot[:4] == b"\x89PNG" else "image/jpeg"
+
+
+def _data_url(screenshot: bytes) -> str:
+    """Encode a screenshot as a ``data:`` URL with a single join of header and base64 text."""
+    return "".join(("data:", _image_media_type(screenshot), ";base64,", _b64encode(screenshot)))
+
+
+# The same page is prompted for the analysis cache key, retries and every provider;
+# keys hold the already truncated snippet head, so entries stay bounded
+@lru_cache(maxsize=256)
+def _render_prompt_suffix(url: str, head: str, truncated: bool) -> str:
+    return (
+        f"URL: {url}\n"
+        f"HTML_SNIPPET_FIRST_4000_CHARS (truncated={str(truncated).lower()}):\n"
+        f"{head}\n"
+        "END_OF_HTML_SNIPPET\n"
+    )
+
+
+@lru_cache(maxsize=256)
+def _render_prompt(url: str, head: str, truncated: bool) -> str:
+    return _PROMPT_PREFIX + _render_prompt_suffix(url, head, truncated)
+
+
+class _JSONObjectScanner:
+    """Track brace depth across streamed text to spot where the first JSON object closes."""
+
+    __slots__ = ("depth", "in_string", "escaped")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> Optional[int]:
+        """Return the index in ``text`` just past the closing brace, or None if still open."""
+        for index, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                # Quotes before the first brace are prose, not JSON strings
+                self.in_string = self.depth > 0
+            elif char == "{":
+                self.depth += 1
+            elif char == "}" and self.depth:
+                self.depth -= 1
+                if not self.depth:
+                    return index + 1
+        return None
+
+
+async def _read_json_object(pieces: AsyncIterator[str]) -> str:
+    """Concatenate streamed text, stopping as soon as the first JSON object is complete.
+
+    Tokens after the closing brace (fence ends, trailing prose) are never awaited, so the
+    caller can close the stream and stop paying for them.
+    """
+    scanner = _JSONObjectScanner()
+    parts: List[str] = []
+    async for piece in pieces:
+        if not piece:
+            continue
+        end = scanner.feed(piece)
+        if end is not None:
+            parts.append(piece[:end])
+            break
+        parts.append(piece)
+    return "".join(parts)
 
 
 class LLMClient(ABC):
     """Abstract base class for LLM clients."""
-    
+
+    # Upper bound on concurrent requests the backend actually serves in parallel
+    max_parallel_requests: Optional[int] = None
+
     @abstractmethod
     async def analyze_page(
         self, 
         url: str, 
-        screenshot_b64: str, 
+        screenshot: bytes, 
         html_snippet: str
     ) -> Dict[str, Any]:
         """Analyze a webpage with vision and text capabilities."""
         pass
 
+    async def analyze_pages(
+        self,
+        items: List[Tuple[str, bytes, str]],
+        concurrency: Optional[int] = None,
+    ) -> List[Union[Dict[str, Any], BaseException]]:
+        """Analyze ``(url, screenshot, html_snippet)`` items concurrently.
+
+        Results keep the order of ``items``; a failed page yields its exception instead of
+        cancelling the others.
+        """
+        limit = concurrency or self.config.llm_max_concurrency
+        if self.max_parallel_requests is not None:
+            limit = min(limit, self.max_parallel_requests)
+        semaphore = asyncio.Semaphore(limit)
+
+        async def analyze_one(item: Tuple[str, bytes, str]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.analyze_page(*item)
+
+        return await asyncio.gather(*(analyze_one(item) for item in items), return_exceptions=True)
+
+    async def warm_up(self) -> None:
+        """Prepare the backing model before the first request (no-op for hosted APIs)."""
+        return None
+
+    async def aclose(self) -> None:
+        """Release pooled connections held by the client."""
+        return None
+
+
+class LLMMixin:
+    """Mixin providing common LLM functionality."""
+    
+    def _build_prompt(self, url: str, html_snippet: str) -> str:
+        """
+        Build a robust analysis prompt for extracting category navigation from an e-commerce page.
+        - Forces REAL selectors (no hallucinations).
+        - Encourages multiple candidate patterns (top-nav, sidebar, dropdown, etc.).
+        - Asks for small innerText evidence to verify selectors.
+        - Captures interactions suitable for Playwright (click/hover/wait).
+        - Adds include/exclude href rules to filter noise links.
+        - Output is STRICT JSON (no comments, no trailing commas).
+        """
+        return _render_prompt(url, html_snippet[:PROMPT_HTML_CHARS], len(html_snippet) > PROMPT_HTML_CHARS)
+
+    def _build_prompt_suffix(self, url: str, html_snippet: str) -> str:
+        """Per-page tail of the prompt; everything before it is the cacheable static prefix."""
+        return _render_prompt_suffix(url, html_snippet[:PROMPT_HTML_CHARS], len(html_snippet) > PROMPT_HTML_CHARS)
+
+    @cached_property
+    def _request_slots(self) -> asyncio.Semaphore:
+        """Bounds in-flight provider requests so concurrent page analyses don't thrash rate limits."""
+        limit = self.config.llm_max_concurrency
+        if self.max_parallel_requests is not None:
+            limit = min(limit, self.max_parallel_requests)
+        return asyncio.Semaphore(limit)
+
+    def _sdk_http_client(self, sdk: Any) -> httpx.AsyncClient:
+        """HTTP/2 pool for the provider SDK, so concurrent requests multiplex over one connection.
+
+        Built from the SDK's own client class so its default timeout and redirect policy still apply.
+        """
+        return sdk.DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=32),
+        )
+    
+    async def _analyze_openai_compatible(
+        self,
+        model: str,
+        provider_name: str,
+        url: str,
+        screenshot: bytes,
+        html_snippet: str,
+    ) -> Dict[str, Any]:
+        """Run one vision chat completion on the client's OpenAI-compatible ``self.client`` and parse it."""
+        prompt_suffix = self._build_prompt_suffix(url, html_snippet)
+
+        try:
+            async with self._request_slots:
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        # Static instructions lead every request so automatic prefix caching matches them
+                        {"role": "system", "content": _PROMPT_PREFIX},
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": prompt_suffix},
+                                {"type": "image_url", "image_url": {"url": _data_url(screenshot)}}
+                            ]
+                        }
+                    ],
+                    temperature=self.config.model_temperature,
+                    max_tokens=self.config.max_tokens,
+                    stream=True
+                )
+                try:
+                    content = await _read_json_object(
+                        chunk.choices[0].delta.content async for chunk in stream if chunk.choices
+                    )
+                finally:
+                    # Aborts generation once the JSON object has closed
+                    await stream.close()
+
+            return self._parse_response(content, url)
+
+        except Exception as e:
+            raise AnalysisError(f"{provider_name} API error: {e}")
+
+    def _parse_response(self, content: str, base_url: str) -> Dict[str, Any]:
+        """Parse LLM response and extract structured data."""
+        try:
+            # Prefer a fenced ```json block, else the outermost {...} span
+            json_match = _JSON_BLOCK_RE.search(content)
+            if json_match:
+                json_str = json_match.group(1)
+            else:
+                start = content.find("{")
+                end = content.rfind("}")
+                if start == -1 or end < start:
+                    raise ValueError("No JSON found in response")
+                json_str = content[start : end + 1]
+
+            structured = orjson.loads(json_str)
+            
+            # Handle new format with nav_models array
+            if "nav_models" in structured and structured["nav_models"]:
+                best_index = structured.get("best_index", 0)
+                best_model = structured["nav_models"][best_index] if best_index < len(structured["nav_models"]) else structured["nav_models"][0]
+                
+                return {
+                    "navigation_type": best_model.get("navigation_type", "unknown"),
+                    "selectors": best_model.get("selectors", {}),
+                    "interactions": best_model.get("interactions", []),
+                    "confidence": float(best_model.get("confidence", 0.5)),
+                    "notes": structured.get("notes", []),
+                    "link_filters": best_model.get("link_filters", {}),
+                    "evidence": best_model.get("evidence", {}),
+                    "analyzed_at": self._get_timestamp()
+                }
+            
+            # Fallback to old format
+            return {
+                "navigation_type": structured.get("navigation_type", "unknown"),
+                "selectors": structured.get("selectors", {}),
+                "interactions": structured.get("interactions", []),
+                "confidence": float(structured.get("confidence", 0.5)),
+                "notes": structured.get("notes", []),
+                "analyzed_at": self._get_timestamp()
+            }
+            
+        except (orjson.JSONDecodeError, ValueError, KeyError) as e:
+            raise AnalysisError(f"Failed to parse LLM response: {e}\nResponse: {content}")
+    
+    def _get_timestamp(self) -> str:
+        """Get current UTC timestamp, formatted at most once per second."""
+        second = int(time.time())
+        if second != _timestamp_cache[0]:
+            _timestamp_cache[:] = [second, datetime.fromtimestamp(second, tz=timezone.utc).isoformat()]
+        return _timestamp_cache[1]
+
 
-class OpenAILLMClient(LLMClient):
+class OpenAILLMClient(LLMMixin, LLMClient):
     """OpenAI client for text and vision analysis."""
     
     def __init__(self, config=None):
@@ -38,50 +383,31 @@ class OpenAILLMClient(LLMClient):
                 import openai
                 self._client = openai.AsyncOpenAI(
                     api_key=self.config.openai_api_key,
-                    base_url=self.config.openai_base_url
+                    base_url=self.config.openai_base_url,
+                    http_client=self._sdk_http_client(openai)
                 )
             except ImportError:
                 raise ImportError("OpenAI library not installed. Run: pip install openai")
         return self._client
     
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+    
     async def analyze_page(
         self, 
         url: str, 
-        screenshot_b64: str, 
+        screenshot: bytes, 
         html_snippet: str
     ) -> Dict[str, Any]:
         """Analyze webpage using OpenAI GPT-4 Vision."""
-        prompt = self._build_prompt(url, html_snippet)
-        
-        try:
-            response = await self.client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{screenshot_b64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                temperature=self.config.model_temperature,
-                max_tokens=self.config.max_tokens
-            )
-            
-            content = response.choices[0].message.content
-            return self._parse_response(content, url)
-            
-        except Exception as e:
-            raise AnalysisError(f"OpenAI API error: {e}")
+        return await self._analyze_openai_compatible(
+            self.config.openai_model, "OpenAI", url, screenshot, html_snippet
+        )
 
 
-class AnthropicLLMClient(LLMClient):
+class AnthropicLLMClient(LLMMixin, LLMClient):
     """Anthropic client for text and vision analysis."""
     
     def __init__(self, config=None):
@@ -94,108 +420,168 @@ class AnthropicLLMClient(LLMClient):
             try:
                 import anthropic
                 self._client = anthropic.AsyncAnthropic(
-                    api_key=self.config.anthropic_api_key
+                    api_key=self.config.anthropic_api_key,
+                    http_client=self._sdk_http_client(anthropic)
                 )
             except ImportError:
                 raise ImportError("Anthropic library not installed. Run: pip install anthropic")
         return self._client
     
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+    
     async def analyze_page(
         self, 
         url: str, 
-        screenshot_b64: str, 
+        screenshot: bytes, 
         html_snippet: str
     ) -> Dict[str, Any]:
         """Analyze webpage using Anthropic Claude Vision."""
-        prompt = self._build_prompt(url, html_snippet)
+        prompt_suffix = self._build_prompt_suffix(url, html_snippet)
         
         try:
-            response = await self.client.messages.create(
-                model=self.config.anthropic_model,
-                max_tokens=self.config.max_tokens,
-                temperature=self.config.model_temperature,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/png",
-                                "data": screenshot_b64
+            async with self._request_slots:
+                async with self.client.messages.stream(
+                    model=self.config.anthropic_model,
+                    max_tokens=self.config.max_tokens,
+                    temperature=self.config.model_temperature,
+                    # Cache breakpoint after the static instructions; only the page tail is re-read
+                    system=[{"type": "text", "text": _PROMPT_PREFIX, "cache_control": {"type": "ephemeral"}}],
+                    messages=[{
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt_suffix},
+                            {
+                                "type": "image",
+                                "source": {
+                                    "type": "base64",
+                                    "media_type": _image_media_type(screenshot),
+                                    "data": _b64encode(screenshot)
+                                }
                             }
-                        }
-                    ]
-                }]
-            )
-            
-            content = response.content[0].text
+                        ]
+                    }]
+                ) as stream:
+                    # Leaving the block closes the stream and stops generation after the JSON
+                    content = await _read_json_object(stream.text_stream)
+
             return self._parse_response(content, url)
             
         except Exception as e:
             raise AnalysisError(f"Anthropic API error: {e}")
 
 
-class OllamaLLMClient(LLMClient):
+class OllamaLLMClient(LLMMixin, LLMClient):
     """Ollama client for local LLM inference."""
-    
+
+    # A local Ollama server mostly queues requests for one model
+    max_parallel_requests = 2
+
     def __init__(self, config=None):
         self.config = config or get_config()
+        self._http = None
+
+    @property
+    def http(self):
+        """Keep-alive HTTP client shared by every request of this client."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.config.ollama_host,
+                # Negotiated over TLS only, so a remote Ollama behind a proxy multiplexes requests
+                http2=True,
+                timeout=httpx.Timeout(120.0),
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def warm_up(self) -> None:
+        """Load the model into memory so the first analysis doesn't pay the load time."""
+        try:
+            # A generate request without a prompt only loads the model
+            response = await self.http.post(
+                "/api/generate",
+                content=orjson.dumps({"model": self.config.ollama_model, "keep_alive": self.config.ollama_keep_alive}),
+                headers=_JSON_HEADERS,
+            )
+            response.raise_for_status()
+            logger.debug("Ollama model {} loaded", self.config.ollama_model)
+        except httpx.HTTPError as e:
+            logger.warning("Ollama warm-up failed: {}", e)
     
+    @staticmethod
+    async def _stream_content(response: httpx.Response) -> AsyncIterator[str]:
+        """Yield message text from Ollama's newline-delimited JSON chunks."""
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = orjson.loads(line)
+            if "error" in chunk:
+                raise AnalysisError(f"Ollama error: {chunk['error']}")
+            yield chunk.get("message", {}).get("content", "")
+            if chunk.get("done"):
+                return
+
     async def analyze_page(
         self, 
         url: str, 
-        screenshot_b64: str, 
+        screenshot: bytes, 
         html_snippet: str
     ) -> Dict[str, Any]:
         """Analyze webpage using local Ollama model."""
-        from .utils.logger import get_logger
-        logger = get_logger(0)  # Use default logger
-        
-        prompt = self._build_prompt(url, html_snippet)
+        prompt_suffix = self._build_prompt_suffix(url, html_snippet)
         
         try:
-            import httpx
-            import time
-            
-            logger.info("Sending request to Ollama at {}", self.config.ollama_host)
-            logger.info("Using model: {}", self.config.ollama_model)
-            logger.debug("Prompt length: {} chars", len(prompt))
+            logger.info(
+                "Sending {}-char prompt to Ollama at {} (model {})",
+                len(_PROMPT_PREFIX) + len(prompt_suffix),
+                self.config.ollama_host,
+                self.config.ollama_model,
+            )
             
             start_time = time.time()
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.config.ollama_host}/api/chat",
-                    json={
+            async with self._request_slots:
+                # No wall-clock limit: a stalled model is caught by the gap between streamed chunks
+                async with self.http.stream(
+                    "POST",
+                    "/api/chat",
+                    content=orjson.dumps({
                         "model": self.config.ollama_model,
+                        # A shared system prefix lets Ollama reuse its KV cache between pages
                         "messages": [
-                            {"role": "user", "content": prompt}
+                            {"role": "system", "content": _PROMPT_PREFIX},
+                            {"role": "user", "content": prompt_suffix}
                         ],
-                        "stream": False,
+                        "stream": True,
+                        "keep_alive": self.config.ollama_keep_alive,
                         "options": {
                             "temperature": self.config.model_temperature,
                             "num_predict": self.config.max_tokens
                         }
-                    },
-                    timeout=120.0  # Increased timeout for complex analysis
-                )
-                
-                elapsed = time.time() - start_time
-                logger.info("Ollama response received in {:.2f}s", elapsed)
-                
-                response.raise_for_status()
-                
-                result = response.json()
-                # Ollama /api/chat returns message in result["message"]["content"]
-                content = result.get("message", {}).get("content", "")
-                logger.debug("Response length: {} chars", len(content))
-                
-                return self._parse_response(content, url)
-                
+                    }),
+                    headers=_JSON_HEADERS,
+                    timeout=httpx.Timeout(10.0, read=_OLLAMA_CHUNK_TIMEOUT),
+                ) as response:
+                    if response.is_error:
+                        await response.aread()
+                    response.raise_for_status()
+
+                    content = await _read_json_object(self._stream_content(response))
+            logger.info(
+                "Ollama response received in {:.2f}s ({} chars)", time.time() - start_time, len(content)
+            )
+
+            return self._parse_response(content, url)
+
         except httpx.ReadTimeout as e:
-            logger.error("Ollama request timed out after 120s")
+            logger.error("Ollama produced no output for {:.0f}s", _OLLAMA_CHUNK_TIMEOUT)
             logger.error("Model {} may be too slow or not loaded", self.config.ollama_model)
             raise AnalysisError(
                 f"Ollama timeout: Model '{self.config.ollama_model}' took too long to respond. "
@@ -204,12 +590,14 @@ class OllamaLLMClient(LLMClient):
         except httpx.HTTPStatusError as e:
             logger.error("Ollama HTTP error: {} {}", e.response.status_code, e.response.text)
             raise AnalysisError(f"Ollama HTTP error: {e.response.status_code} - {e.response.text}")
+        except AnalysisError:
+            raise
         except Exception as e:
             logger.error("Ollama API error: {}", str(e))
             raise AnalysisError(f"Ollama API error: {e}")
 
 
-class OpenRouterLLMClient(LLMClient):
+class OpenRouterLLMClient(LLMMixin, LLMClient):
     """OpenRouter client for accessing various models."""
     
     def __init__(self, config=None):
@@ -223,218 +611,219 @@ class OpenRouterLLMClient(LLMClient):
                 import openai
                 self._client = openai.AsyncOpenAI(
                     api_key=self.config.openrouter_api_key,
-                    base_url="https://openrouter.ai/api/v1"
+                    base_url="https://openrouter.ai/api/v1",
+                    http_client=self._sdk_http_client(openai)
                 )
             except ImportError:
                 raise ImportError("OpenAI library not installed. Run: pip install openai")
         return self._client
     
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+    
     async def analyze_page(
         self, 
         url: str, 
-        screenshot_b64: str, 
+        screenshot: bytes, 
         html_snippet: str
     ) -> Dict[str, Any]:
         """Analyze webpage using OpenRouter model."""
-        prompt = self._build_prompt(url, html_snippet)
-        
+        return await self._analyze_openai_compatible(
+            self.config.openrouter_model, "OpenRouter", url, screenshot, html_snippet
+        )
+
+
+class RacingLLMClient(LLMMixin, LLMClient):
+    """Send each analysis to several providers and keep the first successful answer."""
+
+    def __init__(self, clients: List[LLMClient], config=None):
+        self.config = config or get_config()
+        self.clients = clients
+
+    async def warm_up(self) -> None:
+        await asyncio.gather(*(client.warm_up() for client in self.clients))
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(client.aclose() for client in self.clients))
+
+    async def analyze_page(
+        self,
+        url: str,
+        screenshot: bytes,
+        html_snippet: str
+    ) -> Dict[str, Any]:
+        """Return the first provider result; slower requests are cancelled."""
+        pending = {
+            asyncio.create_task(client.analyze_page(url, screenshot, html_snippet))
+            for client in self.clients
+        }
+        errors: List[BaseException] = []
         try:
-            response = await self.client.chat.completions.create(
-                model=self.config.openrouter_model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{screenshot_b64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                temperature=self.config.model_temperature,
-                max_tokens=self.config.max_tokens
-            )
-            
-            content = response.choices[0].message.content
-            return self._parse_response(content, url)
-            
-        except Exception as e:
-            raise AnalysisError(f"OpenRouter API error: {e}")
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+        finally:
+            for task in pending:
+                task.cancel()
+        raise AnalysisError(f"All raced providers failed: {'; '.join(str(e) for e in errors)}")
 
 
-def create_llm_client(config=None) -> LLMClient:
-    """Factory function to create the appropriate LLM client."""
-    config = config or get_config()
-    
-    provider = config.llm_provider.lower()
-    
-    if provider == "openai":
-        return OpenAILLMClient(config)
-    elif provider == "anthropic":
-        return AnthropicLLMClient(config)
-    elif provider == "ollama":
-        return OllamaLLMClient(config)
-    elif provider == "openrouter":
-        return OpenRouterLLMClient(config)
-    else:
-        raise ValueError(f"Unsupported LLM provider: {provider}")
-
-
-# Mixin for common functionality
-class LLMMixin:
-    """Mixin providing common LLM functionality."""
-    
-    def _build_prompt(self, url: str, html_snippet: str) -> str:
-        """
-        Build a robust analysis prompt for extracting category navigation from an e-commerce page.
-        - Forces REAL selectors (no hallucinations).
-        - Encourages multiple candidate patterns (top-nav, sidebar, dropdown, etc.).
-        - Asks for small innerText evidence to verify selectors.
-        - Captures interactions suitable for Playwright (click/hover/wait).
-        - Adds include/exclude href rules to filter noise links.
-        - Output is STRICT JSON (no comments, no trailing commas).
-        """
-        head = html_snippet[:4000]
-        truncated_flag = len(html_snippet) > 4000
-
-        return (
-            "You are an expert DOM analyst helping a Python scraping agent detect PRODUCT TAXONOMY on an e-commerce site.\n"
-            "Return ONLY valid JSON (UTF-8, no comments, no trailing commas). Do NOT include any explanation outside JSON.\n\n"
-            "## CRITICAL UNDERSTANDING\n"
-            "E-commerce sites organize products into hierarchies. These are NOT called 'categories' on every site.\n"
-            "Common names: Categories, Departments, Collections, Ranges, Shop By, Browse, Product Types, Sections.\n"
-            "Your job: Find the PRIMARY PRODUCT ORGANIZATION STRUCTURE - how products are grouped for browsing.\n\n"
-            "## GOAL\n"
-            "Identify how the site organizes products into browsable groups (taxonomy/hierarchy).\n"
-            "Produce REAL CSS selectors present in the HTML below, plus minimal interaction steps if menus are hidden.\n\n"
-            "## HARD REQUIREMENTS\n"
-            "1) Use ONLY classes/ids/structures that appear in the provided HTML. Do NOT invent selectors.\n"
-            "2) Prefer stable anchors: landmark tags (nav, header, aside), ARIA roles (role='navigation'|'menu'|'tree'), data-* attributes.\n"
-            "3) Provide 1–3 candidate 'nav models' (different plausible patterns). Rank by confidence.\n"
-            "4) Include tiny evidence samples (innerText of 1–5 matched links) so a human can verify quickly.\n"
-            "5) If categories are absent/hidden in this snippet, return empty selectors and a fallback plan.\n\n"
-            "## WHAT TO LOOK FOR\n"
-            "- Top navigation: <nav>, <header>, mega menus, hover menus, <ul>/<li> lists, role='menubar'.\n"
-            "- Sidebars: <aside>, .sidebar, .filters, .categories, facets trees, accordion sections.\n"
-            "- Dropdown/accordion/flyout panels: elements toggled by buttons with aria-expanded, aria-controls, data-toggle, etc.\n"
-            "- Breadcrumb/JSON-LD hints: breadcrumb lists or ItemList that reveal taxonomy terms.\n"
-            "- Text clues: 'Departments', 'Collections', 'Ranges', 'Shop', 'Shop by', 'Browse', 'All Products', 'Product Types'.\n"
-            "- Link patterns: URLs containing /category/, /c/, /dept/, /collection/, /shop/, /browse/.\n\n"
-            "## DISTINGUISH PRODUCTS FROM CATEGORIES\n"
-            "❌ WRONG: Individual product names (e.g., 'Paracetamol 500mg', 'Dove Soap', 'Samsung Phone')\n"
-            "✅ CORRECT: Product groups (e.g., 'Health & Pharmacy', 'Beauty', 'Electronics')\n"
-            "❌ WRONG: .product-item, .product-card, .product-list\n"
-            "✅ CORRECT: .category-item, .department-link, .nav-item, .menu-link\n\n"
-            "## NOISE TO AVOID (exclude via link filters)\n"
-            "- Account, Login, Register, Cart, Basket, Wishlist, Help/FAQ, Contact, Blog, Checkout, Search, Language, Currency.\n"
-            "- Very generic footers that are not category trees.\n\n"
-            "## OUTPUT (STRICT JSON)\n"
-            "{\n"
-            '  "url": "<echo URL>",\n'
-            '  "html_truncated": true|false,\n'
-            '  "nav_models": [\n'
-            "    {\n"
-            '      "navigation_type": "top_nav|sidebar|dropdown|accordion|hover_menu|filter_sidebar|breadcrumbs|unknown",\n'
-            '      "selectors": {\n'
-            '        "nav_container": "REAL CSS selector for container",\n'
-            '        "category_links": "REAL CSS selector for category anchors",\n'
-            '        "top_level_items": "selector for top-level li/div nodes or anchors",\n'
-            '        "flyout_panel": "selector for flyout/dropdown panels or null",\n'
-            '        "subcategory_list": "selector for subcategory lists or null"\n'
-            "      },\n"
-            '      "interactions": [\n'
-            '        {"type": "hover|click", "target": "selector", "wait_for": "selector to appear or null"}\n'
-            "      ],\n"
-            '      "link_filters": {\n'
-            '        "include_href_patterns": ["regex or substring patterns like \\"/category\\", \\"/c/\\""],\n'
-            '        "exclude_href_patterns": ["account|login|register|cart|wishlist|help|faq|contact|checkout|search|language|currency"]\n'
-            "      },\n"
-            '      "evidence": {\n'
-            '        "sample_text": ["up to 5 innerText samples e.g. \\"Women\\", \\"Men\\", \\"Kids\\", \\"Sale\\""],\n'
-            '        "counts": {"category_links": 0, "top_level_items": 0}\n'
-            "      },\n"
-            '      "confidence": 0.0\n'
-            "    }\n"
-            "  ],\n"
-            '  "best_index": 0,\n'
-            '  "fallback_plan": [\n'
-            '    "If no categories found: try sitemap.xml for /category/ or /collections/, check JSON-LD ItemList, or scan <footer> with stricter include filters."\n'
-            "  ],\n"
-            '  "notes": ["brief reasoning on why the best model was chosen"]\n'
-            "}\n\n"
-            "## VALIDATION RULES\n"
-            "- Every selector MUST match something that exists in the provided HTML.\n"
-            "- Arrays may be empty if unknown; use empty arrays [] rather than null.\n"
-            "- confidence in [0.0, 1.0]. best_index is the index of the strongest candidate in nav_models.\n\n"
-            f"URL: {url}\n"
-            f"HTML_SNIPPET_FIRST_4000_CHARS (truncated={str(truncated_flag).lower()}):\n"
-            f"{head}\n"
-            "END_OF_HTML_SNIPPET\n"
+def _is_transient(error: BaseException) -> bool:
+    """Whether the provider error behind an ``AnalysisError`` is worth retrying."""
+    cause = error.__cause__ or error.__context__ or error
+    if isinstance(cause, httpx.TransportError):
+        return True
+    status = getattr(cause, "status_code", None)
+    if status is None:
+        status = getattr(getattr(cause, "response", None), "status_code", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+class CircuitBreakerLLMClient(LLMMixin, LLMClient):
+    """Retry transient provider failures with backoff and stop calling a provider that keeps failing.
+
+    Once retries are exhausted the circuit opens for 1, 5, 25 and then at most 60 minutes on
+    consecutive failures; the first call after that window probes the provider again.
+    Concurrent calls for the same page join the request already in flight; it is cancelled
+    once every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self, delegate: LLMClient, config=None):
+        self.config = config or get_config()
+        self.delegate = delegate
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._waiters: Counter[asyncio.Task] = Counter()
+
+    @property
+    def max_parallel_requests(self) -> Optional[int]:
+        return self.delegate.max_parallel_requests
+
+    async def warm_up(self) -> None:
+        await self.delegate.warm_up()
+
+    async def aclose(self) -> None:
+        await self.delegate.aclose()
+
+    async def analyze_page(
+        self,
+        url: str,
+        screenshot: bytes,
+        html_snippet: str
+    ) -> Dict[str, Any]:
+        """Delegate the analysis unless the circuit is open."""
+        key = (url, html_snippet)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._analyze_page(url, screenshot, html_snippet))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        self._waiters[task] += 1
+        try:
+            # Shielded so one caller giving up does not cancel the request for the others;
+            # deep-copied because callers prune nested selectors/evidence in place
+            return copy.deepcopy(await asyncio.shield(task))
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1:
+                # Nobody else wants the answer (e.g. the losing side of a race); stop paying for it
+                self._forget_inflight(key, task)
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _forget_inflight(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def _finish_inflight(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        self._forget_inflight(key, task)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller was cancelled
+
+    async def _analyze_page(self, url: str, screenshot: bytes, html_snippet: str) -> Dict[str, Any]:
+        name = type(self.delegate).__name__
+        remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            raise AnalysisError(f"{name} circuit open for another {remaining:.0f}s after repeated failures")
+
+        delay = self.config.retry_delay / 1000
+        retrying = tenacity.AsyncRetrying(
+            stop=tenacity.stop_after_attempt(self.config.max_retries + 1),
+            wait=tenacity.wait_exponential(multiplier=delay, max=30) + tenacity.wait_random(0, delay),
+            retry=tenacity.retry_if_exception(_is_transient),
+            reraise=True,
         )
-    
-    def _parse_response(self, content: str, base_url: str) -> Dict[str, Any]:
-        """Parse LLM response and extract structured data."""
         try:
-            # Try to find JSON in the response
-            import re
-            
-            # Look for JSON code block
-            json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # Look for JSON object
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-                else:
-                    raise ValueError("No JSON found in response")
-            
-            structured = json.loads(json_str)
-            
-            # Handle new format with nav_models array
-            if "nav_models" in structured and structured["nav_models"]:
-                best_index = structured.get("best_index", 0)
-                best_model = structured["nav_models"][best_index] if best_index < len(structured["nav_models"]) else structured["nav_models"][0]
-                
-                return {
-                    "navigation_type": best_model.get("navigation_type", "unknown"),
-                    "selectors": best_model.get("selectors", {}),
-                    "interactions": best_model.get("interactions", []),
-                    "confidence": float(best_model.get("confidence", 0.5)),
-                    "notes": structured.get("notes", []),
-                    "link_filters": best_model.get("link_filters", {}),
-                    "evidence": best_model.get("evidence", {}),
-                    "analyzed_at": self._get_timestamp()
-                }
-            
-            # Fallback to old format
-            return {
-                "navigation_type": structured.get("navigation_type", "unknown"),
-                "selectors": structured.get("selectors", {}),
-                "interactions": structured.get("interactions", []),
-                "confidence": float(structured.get("confidence", 0.5)),
-                "notes": structured.get("notes", []),
-                "analyzed_at": self._get_timestamp()
-            }
-            
-        except (json.JSONDecodeError, ValueError, KeyError) as e:
-            raise AnalysisError(f"Failed to parse LLM response: {e}\nResponse: {content}")
-    
-    def _get_timestamp(self) -> str:
-        """Get current timestamp."""
-        from datetime import datetime
-        return datetime.utcnow().isoformat()
+            result = await retrying(self.delegate.analyze_page, url, screenshot, html_snippet)
+        except AnalysisError as e:
+            if _is_transient(e):
+                self._consecutive_failures += 1
+                open_for = min(60 * 5 ** (self._consecutive_failures - 1), 3600)
+                self._open_until = time.monotonic() + open_for
+                logger.warning("{} failing, pausing requests for {}s: {}", name, open_for, e)
+            raise
+        self._consecutive_failures = 0
+        return result
+
+
+_CLIENT_CLASSES = {
+    "openai": OpenAILLMClient,
+    "anthropic": AnthropicLLMClient,
+    "ollama": OllamaLLMClient,
+    "openrouter": OpenRouterLLMClient,
+}
+
+
+# Process-wide clients keyed by (provider, settings); released by shutdown_llm_clients()
+_shared_clients: Dict[Tuple[str, Any], LLMClient] = {}
+
+
+def _provider_client(provider: str, config) -> LLMClient:
+    """One client per (provider, settings) so every caller shares its connection pool and circuit."""
+    client = _shared_clients.get((provider, config))
+    if client is None:
+        try:
+            client_class = _CLIENT_CLASSES[provider]
+        except KeyError:
+            raise ValueError(f"Unsupported LLM provider: {provider}") from None
+        client = _shared_clients[(provider, config)] = CircuitBreakerLLMClient(client_class(config), config)
+    return client
+
+
+async def shutdown_llm_clients() -> None:
+    """Close the shared clients' connection pools and forget them.
+
+    Shared clients hold loop-bound HTTP pools and semaphores, so callers must await this
+    before the event loop closes; agents never close shared clients themselves.
+    """
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+    results = await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+    for error in results:
+        if isinstance(error, Exception):
+            logger.debug("LLM client close failed: {}", error)
 
 
-# Apply mixin to all client classes
-for client_class in [OpenAILLMClient, AnthropicLLMClient, OllamaLLMClient, OpenRouterLLMClient]:
-    for method_name in ['_build_prompt', '_parse_response', '_get_timestamp']:
-        setattr(client_class, method_name, getattr(LLMMixin, method_name))
+def create_llm_client(config=None) -> LLMClient:
+    """Factory function to create the appropriate LLM client."""
+    config = config or get_config()
+    
+    client = _provider_client(config.llm_provider.lower(), config)
+    if not config.race_providers:
+        return client
+    return RacingLLMClient(
+        [client, *(_provider_client(provider, config) for provider in config.race_providers)],
+        config,
+    )
 
 
 __all__ = [
@@ -443,5 +832,9 @@ __all__ = [
     "AnthropicLLMClient", 
     "OllamaLLMClient", 
     "OpenRouterLLMClient",
-    "create_llm_client"
+    "CircuitBreakerLLMClient",
+    "RacingLLMClient",
+    "PROMPT_HTML_CHARS",
+    "create_llm_client",
+    "shutdown_llm_clients"
 ]
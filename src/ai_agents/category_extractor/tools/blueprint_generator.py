@@ -1,11 +1,12 @@
 """Tool that generates reusable extraction blueprints."""
 from __future__ import annotations
 
-import json
+from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+import orjson
 from pydantic import BaseModel, Field
 from strands import tool
 
@@ -62,13 +63,14 @@ class BlueprintGeneratorTool:
             confidence_score=strategy.get("confidence", 0.5),
         )
 
+        stats = self._build_stats(categories)
         blueprint = BlueprintModel(
             metadata=metadata,
             extraction_strategy=self._build_strategy_section(strategy),
             selectors=strategy.get("selectors", {}),
             interactions=strategy.get("interactions", []),
-            validation_rules=self._build_validation_rules(categories, strategy),
-            extraction_stats=self._build_stats(categories),
+            validation_rules=self._build_validation_rules(categories, strategy, stats["max_depth"]),
+            extraction_stats=stats,
             notes=self._normalize_notes(strategy.get("notes", [])),
             evidence=self._build_evidence(categories, strategy),
             link_filters=strategy.get("link_filters", {}),
@@ -111,9 +113,10 @@ class BlueprintGeneratorTool:
             "dynamic_loading": strategy.get("dynamic_loading", {}),
         }
 
-    def _build_validation_rules(self, categories: List[Dict[str, Any]], strategy: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_validation_rules(
+        self, categories: List[Dict[str, Any]], strategy: Dict[str, Any], max_depth: int
+    ) -> Dict[str, Any]:
         total = len(categories)
-        max_depth = max((category.get("depth", 0) for category in categories), default=0)
         return {
             "min_categories": max(1, total // 4),
             "max_categories": total * 2,
@@ -123,13 +126,10 @@ class BlueprintGeneratorTool:
         }
 
     def _build_stats(self, categories: List[Dict[str, Any]]) -> Dict[str, Any]:
-        depth_counts: Dict[int, int] = {}
-        for category in categories:
-            depth = int(category.get("depth", 0))
-            depth_counts[depth] = depth_counts.get(depth, 0) + 1
+        depth_counts = Counter(int(category.get("depth", 0)) for category in categories)
         return {
             "total_categories": len(categories),
-            "max_depth": max(depth_counts.keys(), default=0),
+            "max_depth": max(depth_counts, default=0),
             "categories_by_depth": {str(depth): count for depth, count in depth_counts.items()},
         }
 
@@ -139,8 +139,7 @@ class BlueprintGeneratorTool:
         filename = f"retailer_{self.agent.retailer_id}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json"
         path = output_dir / filename
         try:
-            with path.open("w", encoding="utf-8") as handle:
-                json.dump(blueprint.model_dump(mode="json"), handle, indent=2)
+            path.write_bytes(orjson.dumps(blueprint.model_dump(mode="json"), option=orjson.OPT_INDENT_2))
         except OSError as exc:
             raise BlueprintError(f"Failed to write blueprint to {path}: {exc}") from exc
         self.logger.info("Blueprint saved to {}", path)
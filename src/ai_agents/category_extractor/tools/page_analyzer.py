@@ -1,20 +1,34 @@
 """Tool for analyzing webpage structure."""
 from __future__ import annotations
 
-import base64
+import asyncio
 from datetime import datetime
-from typing import Any, Dict
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Any, Dict, Tuple
 
 import tenacity
 from strands import tool
 
 from ..config import get_config
 from ..errors import AnalysisError
-from ..llm_client import create_llm_client
+from ..llm_client import PROMPT_HTML_CHARS, LLMClient, create_llm_client
 from ..utils.logger import get_logger
+from ..utils.response_cache import ResponseCache, cache_key
+from ..utils.selector_check import count_selector_matches
 from ..utils.url_utils import ensure_absolute
 
 
+# Vision models downscale large images anyway; JPEG at CSS scale keeps request bodies several times smaller
+_SCREENSHOT_OPTIONS = {"type": "jpeg", "quality": 85, "scale": "css"}
+
+
+@lru_cache(maxsize=4)
+def _shared_cache(directory: str, ttl_seconds: int) -> ResponseCache:
+    """One cache per directory so every agent in the process shares the in-memory tier."""
+    return ResponseCache(directory, ttl_seconds)
+
+
 class PageAnalyzerTool:
     """Analyzes a page to determine category extraction strategy."""
 
@@ -23,6 +37,11 @@ class PageAnalyzerTool:
         self.config = get_config()
         self.llm_client = create_llm_client(self.config)
         self.logger = get_logger(agent.retailer_id)
+        self.cache = (
+            _shared_cache(str(Path(self.config.blueprint_dir) / ".cache"), self.config.llm_cache_ttl)
+            if self.config.llm_cache_enabled
+            else None
+        )
 
     @tool
     async def analyze(self, url: str, force_refresh: bool = False) -> Dict[str, Any]:
@@ -50,13 +69,87 @@ class PageAnalyzerTool:
         # Try to reveal mega menus by hovering over top-level nav items
         await self._reveal_mega_menus(page)
         
-        screenshot_b64 = await self._capture_screenshot(page)
+        screenshot = await self._capture_screenshot(page)
         html_snippet = await self._simplified_html(page)
 
-        analysis = await self.llm_client.analyze_page(url, screenshot_b64, html_snippet)
+        analysis = await self._analyze_with_cache(url, screenshot, html_snippet)
         self.agent.state["analysis"] = analysis
         return analysis
 
+    @cached_property
+    def light_llm_client(self) -> LLMClient:
+        provider = self.config.llm_provider.lower()
+        return create_llm_client(self.config.model_copy(update={f"{provider}_model": self.config.analyzer_model}))
+
+    async def warm_up(self) -> None:
+        """Load every model this tool may route to, so neither pays cold start on its first page."""
+        clients = [self.llm_client]
+        if self.config.analyzer_model:
+            clients.append(self.light_llm_client)
+        await asyncio.gather(*(client.warm_up() for client in clients))
+
+    def _select_client(self, html_snippet: str) -> Tuple[LLMClient, str]:
+        """Route small navigation snippets to ``analyzer_model``; keep the main model for complex pages."""
+        # Measured on what the prompt actually carries, not the full simplified HTML
+        prompt_chars = min(len(html_snippet), PROMPT_HTML_CHARS)
+        if self.config.analyzer_model and prompt_chars <= self.config.analyzer_max_html_chars:
+            return self.light_llm_client, self.config.analyzer_model
+        provider = self.config.llm_provider.lower()
+        return self.llm_client, getattr(self.config, f"{provider}_model", self.config.model_id)
+
+    async def _analyze_with_cache(self, url: str, screenshot: bytes, html_snippet: str) -> Dict[str, Any]:
+        """Call the LLM unless an identical (site_url, prompt) analysis is cached."""
+        client, model = self._select_client(html_snippet)
+        self.logger.info("Analyzing with model {} ({} HTML chars)", model, len(html_snippet))
+        if self.cache is None:
+            analysis = await client.analyze_page(url, screenshot, html_snippet)
+            return await self._drop_unmatched_selectors(analysis)
+
+        provider = self.config.llm_provider.lower()
+        prompt = client._build_prompt(url, html_snippet)
+        key = cache_key(provider, model, url, prompt)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.logger.info("Using cached analysis for {}", url)
+            return cached
+
+        analysis = await client.analyze_page(url, screenshot, html_snippet)
+        analysis = await self._drop_unmatched_selectors(analysis)
+        self.cache.set(key, analysis)
+        return analysis
+
+    async def _drop_unmatched_selectors(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Null out selectors that match nothing on the live page and scale confidence down.
+
+        Checked against the DOM rather than the simplified snippet, which strips attributes and
+        ancestors that real selectors may rely on.
+        """
+        page = self.agent.page
+        selectors = analysis.get("selectors") or {}
+        if page is None or not selectors:
+            return analysis
+        counts = {
+            name: count
+            for name, count in (await count_selector_matches(page, selectors)).items()
+            if count is not None
+        }
+        if not counts:
+            return analysis
+
+        missing = [name for name, count in counts.items() if count == 0]
+        evidence = {**(analysis.get("evidence") or {}), "counts": counts}
+        if not missing:
+            return {**analysis, "evidence": evidence}
+
+        self.logger.warning("Dropping selectors that match nothing on the page: {}", missing)
+        return {
+            **analysis,
+            "selectors": {**selectors, **dict.fromkeys(missing)},
+            "evidence": evidence,
+            "confidence": analysis.get("confidence", 0.5) * (1 - len(missing) / len(counts)),
+        }
+
     async def _handle_cookie_consent(self, page) -> None:
         selectors = [
             "button:has-text('Accept')",
@@ -132,24 +225,22 @@ class PageAnalyzerTool:
             except Exception:  # noqa: BLE001
                 continue
 
-    async def _capture_screenshot(self, page) -> str:
-        """Capture screenshot with fallback strategies."""
+    async def _capture_screenshot(self, page) -> bytes:
+        """Capture screenshot with fallback strategies; clients encode it only if they send it."""
         try:
             # Try full page screenshot first
-            data = await page.screenshot(full_page=True, type="png")
-            return base64.b64encode(data).decode("ascii")
+            return await page.screenshot(full_page=True, **_SCREENSHOT_OPTIONS)
         except Exception as e:
             self.logger.warning("Full page screenshot failed: {}, trying viewport only", e)
             try:
                 # Fallback: viewport only (visible area)
-                data = await page.screenshot(full_page=False, type="png")
-                return base64.b64encode(data).decode("ascii")
+                return await page.screenshot(full_page=False, **_SCREENSHOT_OPTIONS)
             except Exception as e2:
                 self.logger.error("Viewport screenshot also failed: {}, returning empty", e2)
                 # Return a minimal 1x1 transparent PNG as last resort
                 # This allows the extraction to continue without screenshot
                 minimal_png = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
-                return base64.b64encode(minimal_png).decode("ascii")
+                return minimal_png
 
     async def _simplified_html(self, page) -> str:
         """Extract relevant HTML focusing on navigation areas."""
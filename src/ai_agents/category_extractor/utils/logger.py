@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 import sys
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Union
 
 from loguru import logger
 
@@ -46,9 +47,20 @@ def setup_logger() -> None:
 
 
 def get_logger(retailer_id: Optional[int] = None):
-    """Return logger bound with retailer context."""
+    """Return logger bound with retailer context.
+
+    Loguru only formats ``{}`` placeholders once a sink accepts the record, so
+    pass values as arguments rather than pre-formatted strings. For arguments
+    that are expensive to compute, use ``logger.opt(lazy=True)`` with callables.
+    """
     setup_logger()
-    return logger.bind(retailer_id=retailer_id or "n/a")
+    return _bound_logger(retailer_id or "n/a")
+
+
+@lru_cache(maxsize=128)
+def _bound_logger(retailer_id: Union[int, str]):
+    # Bound loggers are immutable, so every component for a retailer can share one
+    return logger.bind(retailer_id=retailer_id)
 
 
 log = get_logger()
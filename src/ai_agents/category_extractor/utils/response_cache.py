@@ -0,0 +1,77 @@
+"""Disk-backed cache for deterministic LLM responses."""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+def cache_key(*parts: str) -> str:
+    """Return a stable SHA-256 key for the given string parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Store JSON-serialisable results as ``<directory>/<key>.json`` with an mtime-based TTL.
+
+    Recently used entries are also kept in memory as JSON text, so warm hits skip the disk and
+    every caller still receives its own copy.
+    """
+
+    def __init__(self, directory: str | Path, ttl_seconds: int, max_entries: int = 256) -> None:
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            stored_at, payload = entry
+            if time.time() - stored_at <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                return json.loads(payload)
+            del self._memory[key]
+
+        path = self._path(key)
+        try:
+            stored_at = path.stat().st_mtime
+            if time.time() - stored_at > self.ttl_seconds:
+                return None
+            payload = path.read_text(encoding="utf-8")
+            value = json.loads(payload)
+        except (OSError, json.JSONDecodeError):
+            return None
+        self._remember(key, stored_at, payload)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        payload = json.dumps(value)
+        self._remember(key, time.time(), payload)
+        path = self._path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(payload, encoding="utf-8")
+            tmp_path.replace(path)
+        except OSError:
+            pass  # Caching is best-effort; a failed write only costs a future miss
+
+    def _remember(self, key: str, stored_at: float, payload: str) -> None:
+        self._memory[key] = (stored_at, payload)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+
+__all__ = ["ResponseCache", "cache_key"]
@@ -0,0 +1,27 @@
+"""Check LLM-proposed selectors against the live page they were derived from."""
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+
+async def count_selector_matches(page: Page, selectors: Mapping[str, Any]) -> Dict[str, Optional[int]]:
+    """Return how many elements each selector matches in the current DOM.
+
+    Counting goes through Playwright's selector engine, so ``text=``, XPath and ``:has-text()``
+    are checked like plain CSS; selectors it rejects map to None.
+    """
+    names = [name for name, selector in selectors.items() if isinstance(selector, str) and selector.strip()]
+    results = await asyncio.gather(
+        *(page.locator(selectors[name]).count() for name in names), return_exceptions=True
+    )
+    return {
+        name: None if isinstance(result, BaseException) else result
+        for name, result in zip(names, results)
+    }
+
+
+__all__ = ["count_selector_matches"]
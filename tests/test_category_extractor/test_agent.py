@@ -1,7 +1,9 @@
 """Tests for CategoryExtractionAgent scaffolding."""
 from __future__ import annotations
 
+import asyncio
 import importlib
+import sys
 from unittest import mock
 
 import pytest
@@ -9,7 +11,146 @@ import pytest
 
 def test_agent_import_raises_without_strands(monkeypatch: pytest.MonkeyPatch) -> None:
     module = importlib.import_module("src.ai_agents.category_extractor.agent")
-    monkeypatch.setattr(module, "StrandsAgent", None, raising=False)
+    monkeypatch.setitem(sys.modules, "strands", None)
 
+    agent = module.CategoryExtractionAgent(retailer_id=1, site_url="https://example.com")
     with pytest.raises(ImportError):
-        module.CategoryExtractionAgent(retailer_id=1, site_url="https://example.com")
+        agent.agent
+
+
+def test_agent_defers_tool_construction() -> None:
+    module = importlib.import_module("src.ai_agents.category_extractor.agent")
+    agent = module.CategoryExtractionAgent(retailer_id=1, site_url="https://example.com")
+
+    assert "page_analyzer" not in vars(agent)
+    assert "agent" not in vars(agent)
+    assert agent.page_analyzer is agent.page_analyzer
+
+
+@pytest.mark.asyncio
+async def test_browser_pool_launches_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = importlib.import_module("src.ai_agents.category_extractor.agent")
+
+    browser = mock.MagicMock()
+    browser.is_connected.return_value = True
+    browser.close = mock.AsyncMock()
+    playwright = mock.MagicMock()
+    playwright.chromium.launch = mock.AsyncMock(return_value=browser)
+    playwright.stop = mock.AsyncMock()
+    starter = mock.MagicMock()
+    starter.start = mock.AsyncMock(return_value=playwright)
+    monkeypatch.setattr("playwright.async_api.async_playwright", lambda: starter)
+
+    first = await module.BrowserPool.get_browser(headless=True)
+    second = await module.BrowserPool.get_browser(headless=True)
+    await module.BrowserPool.shutdown()
+
+    assert first is second is browser
+    playwright.chromium.launch.assert_awaited_once()
+    browser.close.assert_awaited_once()
+    playwright.stop.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ephemeral_agent_owns_its_browser(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = importlib.import_module("src.ai_agents.category_extractor.agent")
+
+    page = mock.MagicMock()
+    page.is_closed.return_value = False
+    page.close = mock.AsyncMock()
+    context = mock.MagicMock()
+    context.add_init_script = mock.AsyncMock()
+    context.new_page = mock.AsyncMock(return_value=page)
+    context.close = mock.AsyncMock()
+    browser = mock.MagicMock()
+    browser.new_context = mock.AsyncMock(return_value=context)
+    browser.close = mock.AsyncMock()
+    playwright = mock.MagicMock()
+    playwright.chromium.launch = mock.AsyncMock(return_value=browser)
+    playwright.stop = mock.AsyncMock()
+    starter = mock.MagicMock()
+    starter.start = mock.AsyncMock(return_value=playwright)
+    monkeypatch.setattr("playwright.async_api.async_playwright", lambda: starter)
+    get_browser = mock.AsyncMock()
+    monkeypatch.setattr(module.BrowserPool, "get_browser", get_browser)
+
+    agent = module.CategoryExtractionAgent(retailer_id=1, site_url="https://example.com", ephemeral=True)
+    agent.db.disconnect = mock.AsyncMock()
+    await agent.initialize_browser()
+    await agent.cleanup()
+
+    get_browser.assert_not_awaited()
+    browser.close.assert_awaited_once()
+    playwright.stop.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cleanup_tolerates_close_errors() -> None:
+    module = importlib.import_module("src.ai_agents.category_extractor.agent")
+    agent = module.CategoryExtractionAgent(retailer_id=1, site_url="https://example.com")
+    agent.db = mock.MagicMock(disconnect=mock.AsyncMock())
+    agent.page = mock.MagicMock(close=mock.AsyncMock())
+    agent.page.is_closed.return_value = False
+    agent.context = mock.MagicMock(close=mock.AsyncMock(side_effect=RuntimeError("gone")))
+
+    page = agent.page
+    await agent.cleanup()
+
+    page.close.assert_awaited_once()
+    agent.db.disconnect.assert_awaited_once()
+    assert agent.page is None and agent.context is None
+
+
+@pytest.mark.asyncio
+async def test_stream_agent_reports_tool_progress() -> None:
+    module = importlib.import_module("src.ai_agents.category_extractor.agent")
+    agent = module.CategoryExtractionAgent(retailer_id=1, site_url="https://example.com")
+
+    async def stream_async(prompt):
+        yield {"data": "Analyzing"}
+        yield {"current_tool_use": {"name": "analyze"}}
+        yield {"current_tool_use": {"name": "analyze"}}
+        yield {"current_tool_use": {"name": "extract"}}
+        yield {"result": "done"}
+
+    agent.agent = mock.MagicMock(stream_async=stream_async)
+    progress = []
+
+    result = await agent._stream_agent("prompt", progress.append)
+
+    assert result == "done"
+    assert progress == ["Running analyze...", "Running extract..."]
+
+
+@pytest.mark.asyncio
+async def test_run_extraction_waits_for_pool_before_cleanup_when_browser_fails() -> None:
+    module = importlib.import_module("src.ai_agents.category_extractor.agent")
+    agent = module.CategoryExtractionAgent(retailer_id=1, site_url="https://example.com")
+    pool = mock.MagicMock(close=mock.AsyncMock())
+
+    async def create_pool():
+        await asyncio.sleep(0.01)
+        return pool
+
+    agent.db._create_pool = create_pool
+    agent.initialize_browser = mock.AsyncMock(side_effect=RuntimeError("no browser"))
+    agent.page_analyzer.llm_client = mock.MagicMock(warm_up=mock.AsyncMock())
+
+    outcome = await agent.run_extraction()
+
+    assert outcome["success"] is False
+    assert agent.state["errors"] == ["no browser"]
+    pool.close.assert_awaited_once()
+    assert agent.db.pool is None
+
+
+@pytest.mark.asyncio
+async def test_cleanup_leaves_shared_llm_clients_open() -> None:
+    module = importlib.import_module("src.ai_agents.category_extractor.agent")
+    agent = module.CategoryExtractionAgent(retailer_id=1, site_url="https://example.com")
+    agent.db = mock.MagicMock(disconnect=mock.AsyncMock())
+    agent.page_analyzer.llm_client = mock.MagicMock(aclose=mock.AsyncMock())
+
+    await agent.cleanup()
+
+    agent.page_analyzer.llm_client.aclose.assert_not_awaited()
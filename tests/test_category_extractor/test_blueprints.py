@@ -5,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from src.ai_agents.category_extractor.blueprints.loader import load_blueprint
+from src.ai_agents.category_extractor.blueprints.loader import compile_blueprint, load_blueprint
 from src.ai_agents.category_extractor.blueprints.executor import execute_blueprint
 from src.ai_agents.category_extractor.tools.blueprint_generator import BlueprintModel, BlueprintMetadata
 from src.ai_agents.category_extractor.errors import BlueprintError
@@ -26,6 +26,43 @@ def test_load_blueprint_validates_schema(tmp_path: Path) -> None:
     assert loaded.metadata.site_url == "https://example.com"
 
 
+def test_compile_blueprint_resolves_interaction_selectors(tmp_path: Path) -> None:
+    blueprint = BlueprintModel(
+        metadata=BlueprintMetadata(site_url="https://example.com", retailer_id=1, confidence_score=0.5),
+        extraction_strategy={},
+        selectors={"nav_container": "nav.main", "flyout_panel": ".flyout"},
+        interactions=[{"action": "hover", "target": "nav_container", "wait_for": "flyout_panel"}],
+        validation_rules={},
+        extraction_stats={},
+    )
+    path = tmp_path / "blueprint.json"
+    path.write_text(blueprint.model_dump_json())
+
+    loaded = load_blueprint(path)
+    compiled = compile_blueprint(loaded)
+
+    assert compiled.interactions == ({"action": "hover", "target": "nav.main", "wait_for": ".flyout"},)
+    # The model keeps the selector keys so re-serialising it round-trips the saved blueprint
+    assert loaded.interactions == [{"action": "hover", "target": "nav_container", "wait_for": "flyout_panel"}]
+
+
+def test_compile_blueprint_is_read_only() -> None:
+    blueprint = BlueprintModel(
+        metadata=BlueprintMetadata(site_url="https://example.com", retailer_id=1, confidence_score=0.5),
+        extraction_strategy={},
+        selectors={"category_links": "nav a"},
+        interactions=[{"action": "scroll"}],
+        validation_rules={},
+        extraction_stats={},
+    )
+    compiled = compile_blueprint(blueprint)
+
+    assert compiled.selectors["category_links"] == "nav a"
+    assert compiled.interactions[0]["action"] == "scroll"
+    with pytest.raises(TypeError):
+        compiled.selectors["category_links"] = "div a"  # type: ignore[index]
+
+
 def test_load_blueprint_missing_file() -> None:
     with pytest.raises(BlueprintError):
         load_blueprint("missing.json")
@@ -51,3 +88,135 @@ async def test_execute_blueprint_requires_links(tmp_path: Path) -> None:
 
     with pytest.raises(BlueprintError):
         await execute_blueprint(DummyPage(), loaded, "https://example.com")
+
+
+@pytest.mark.asyncio
+async def test_execute_blueprint_collects_links_in_one_call(tmp_path: Path) -> None:
+    blueprint = BlueprintModel(
+        metadata=BlueprintMetadata(site_url="https://example.com", retailer_id=1, confidence_score=0.5),
+        extraction_strategy={},
+        selectors={"category_links": "nav a"},
+        interactions=[],
+        validation_rules={},
+        extraction_stats={},
+    )
+
+    class DummyPage:
+        async def eval_on_selector_all(self, selector, script):
+            assert selector == "nav a"
+            return [
+                {"name": "Women", "href": "/women#top"},
+                {"name": "No link", "href": None},
+                {"name": "Broken", "href": "http://[bad"},
+                {"name": "Women (footer)", "href": "https://example.com/women"},
+            ]
+
+    categories = await execute_blueprint(DummyPage(), blueprint, "https://example.com")
+    assert categories == [
+        {"name": "Women", "url": "https://example.com/women", "depth": 0, "parent_id": None}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_execute_blueprint_dispatches_interactions() -> None:
+    blueprint = BlueprintModel(
+        metadata=BlueprintMetadata(site_url="https://example.com", retailer_id=1, confidence_score=0.5),
+        extraction_strategy={},
+        selectors={"category_links": "nav a"},
+        interactions=[{"action": "click", "target": "#menu"}, {"action": "unknown"}, {"action": "scroll"}],
+        validation_rules={},
+        extraction_stats={},
+    )
+    calls = []
+
+    class DummyElement:
+        async def click(self):
+            calls.append("click")
+
+    class DummyPage:
+        async def wait_for_selector(self, selector, timeout):
+            calls.append(f"wait:{selector}")
+            return DummyElement()
+
+        async def evaluate(self, script):
+            calls.append("scroll")
+
+        async def eval_on_selector_all(self, selector, script):
+            return [{"name": "Women", "href": "/women"}]
+
+    await execute_blueprint(DummyPage(), blueprint, "https://example.com")
+    assert calls == ["wait:#menu", "click", "scroll"]
+
+
+@pytest.mark.asyncio
+async def test_execute_blueprint_batches_consecutive_steps() -> None:
+    blueprint = BlueprintModel(
+        metadata=BlueprintMetadata(site_url="https://example.com", retailer_id=1, confidence_score=0.5),
+        extraction_strategy={},
+        selectors={"category_links": "nav a"},
+        interactions=[
+            {"action": "click", "target": "#menu", "wait_for": ".panel"},
+            {"action": "wait", "duration": 100},
+            {"action": "scroll"},
+        ],
+        validation_rules={},
+        extraction_stats={},
+    )
+    evaluated = []
+
+    class DummyPage:
+        async def evaluate(self, script, steps=None):
+            evaluated.append(steps)
+
+        async def eval_on_selector_all(self, selector, script):
+            return [{"name": "Women", "href": "/women"}]
+
+    await execute_blueprint(DummyPage(), blueprint, "https://example.com")
+    assert evaluated == [[dict(step) for step in blueprint.interactions]]
+
+
+@pytest.mark.asyncio
+async def test_execute_blueprint_keeps_playwright_selectors_off_the_batch() -> None:
+    blueprint = BlueprintModel(
+        metadata=BlueprintMetadata(site_url="https://example.com", retailer_id=1, confidence_score=0.5),
+        extraction_strategy={},
+        selectors={"category_links": "nav a"},
+        interactions=[
+            {"action": "click", "target": "#menu"},
+            {"action": "scroll"},
+            {"action": "click", "target": "text=Shop all"},
+            {"action": "wait", "duration": 100},
+            {"action": "scroll", "wait_for": "nav li:has-text('Women')"},
+        ],
+        validation_rules={},
+        extraction_stats={},
+    )
+    calls = []
+
+    class DummyElement:
+        async def click(self):
+            calls.append("click")
+
+    class DummyPage:
+        async def evaluate(self, script, steps=None):
+            calls.append(("batch", [step["action"] for step in steps]) if steps else "scroll")
+
+        async def wait_for_selector(self, selector, timeout):
+            calls.append(f"wait:{selector}")
+            return DummyElement()
+
+        async def wait_for_timeout(self, duration):
+            calls.append("sleep")
+
+        async def eval_on_selector_all(self, selector, script):
+            return [{"name": "Women", "href": "/women"}]
+
+    await execute_blueprint(DummyPage(), blueprint, "https://example.com")
+    assert calls == [
+        ("batch", ["click", "scroll"]),
+        "wait:text=Shop all",
+        "click",
+        "sleep",
+        "scroll",
+        "wait:nav li:has-text('Women')",
+    ]
@@ -1,11 +1,16 @@
 """Integration-oriented tests for CategoryDatabase."""
 from __future__ import annotations
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from unittest import mock
 
+import asyncpg
 import pytest
 
-from src.ai_agents.category_extractor.database import CategoryDatabase
+from src.ai_agents.category_extractor.database import CategoryDatabase, _decode_jsonb, _encode_jsonb
 from src.ai_agents.category_extractor.errors import DatabaseError
 
 TEST_RETAILER_ID = 999
@@ -55,3 +60,301 @@ async def test_duplicate_category_updates_existing(db: CategoryDatabase) -> None
     updated = {**category, "name": "Duplicate Updated"}
     stats = await db.save_categories([updated], TEST_RETAILER_ID)
     assert stats["updated"] >= 1
+
+
+class FakeStatement:
+    def __init__(self, conn: "FakeConnection") -> None:
+        self.conn = conn
+
+    async def fetch(self, names, urls, parent_ids, *args: Any):
+        if set(urls) & self.conn.failing_urls:
+            raise asyncpg.PostgresError("value too long")
+        return self.conn.upsert(names, urls, parent_ids)
+
+
+class FakeConnection:
+    def __init__(self, existing: Optional[Dict[str, int]] = None) -> None:
+        self.existing = existing or {}
+        self.fetch_calls: List[Any] = []
+        self.copy_calls: List[Any] = []
+        self.prepared: List[str] = []
+        self.failing_urls: set = set()
+        self.rollbacks = 0
+
+    @asynccontextmanager
+    async def transaction(self):
+        try:
+            yield
+        except Exception:
+            self.rollbacks += 1
+            raise
+
+    async def prepare(self, sql: str):
+        self.prepared.append(sql)
+        return FakeStatement(self)
+
+    async def fetchval(self, sql: str, *args: Any):
+        return bool(self.existing)
+
+    def upsert(self, names, urls, parent_ids):
+        self.fetch_calls.append(list(zip(names, urls, parent_ids)))
+        start = 100 * len(self.fetch_calls)
+        return [
+            {"id": self.existing.get(url, start + offset), "url": url, "inserted": url not in self.existing}
+            for offset, url in enumerate(urls)
+        ]
+
+    async def copy_records_to_table(self, table: str, *, records, columns):
+        if {record[1] for record in records} & self.failing_urls:
+            raise asyncpg.PostgresError("invalid byte sequence")
+        self.copy_calls.append([dict(zip(columns, record)) for record in records])
+
+    async def fetch(self, sql: str, retailer_id: int, urls: List[str]):
+        start = 1000 * len(self.copy_calls)
+        return [{"id": start + offset, "url": url} for offset, url in enumerate(urls)]
+
+
+class FakePool:
+    def __init__(self, conn: FakeConnection) -> None:
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+def _fake_database(conn: FakeConnection, batch_size: int = 500, concurrency: int = 1) -> CategoryDatabase:
+    database = CategoryDatabase()
+    database.config = database.config.model_copy(
+        update={"db_batch_size": batch_size, "db_save_concurrency": concurrency}
+    )
+    database.pool = FakePool(conn)
+    return database
+
+
+@pytest.mark.asyncio
+async def test_save_categories_upserts_in_batches() -> None:
+    categories = [
+        {"id": i, "name": f"Cat {i}", "url": f"https://example.com/{i}", "depth": 0, "parent_id": None}
+        for i in range(3)
+    ]
+    conn = FakeConnection(existing={category["url"]: 10 + category["id"] for category in categories})
+    stats = await _fake_database(conn, batch_size=2).save_categories(categories, TEST_RETAILER_ID)
+
+    assert stats == {"saved": 0, "updated": 3, "skipped": 0, "errors": 0}
+    assert [len(batch) for batch in conn.fetch_calls] == [2, 1]
+    assert len(conn.prepared) == 1
+
+
+@pytest.mark.asyncio
+async def test_save_categories_inserts_each_depth_in_one_statement() -> None:
+    categories = [
+        {"id": "a", "name": "Women", "url": "https://example.com/women", "depth": 0, "parent_id": None},
+        {"id": "b", "name": "Men", "url": "https://example.com/men", "depth": 0, "parent_id": None},
+        {"id": "c", "name": "Shoes", "url": "https://example.com/women/shoes", "depth": 1, "parent_id": "a"},
+        {"id": "d", "name": "Shirts", "url": "https://example.com/men/shirts", "depth": 1, "parent_id": "b"},
+    ]
+    conn = FakeConnection()
+    stats = await _fake_database(conn).save_categories(categories, TEST_RETAILER_ID)
+
+    assert stats["saved"] == 4
+    assert conn.fetch_calls == [
+        [("Women", "https://example.com/women", None), ("Men", "https://example.com/men", None)],
+        [("Shoes", "https://example.com/women/shoes", 100), ("Shirts", "https://example.com/men/shirts", 101)],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_rolls_back_to_its_savepoint() -> None:
+    categories = [
+        {"id": i, "name": f"Cat {i}", "url": f"https://example.com/{i}", "depth": 0, "parent_id": None}
+        for i in range(3)
+    ]
+    conn = FakeConnection()
+    conn.failing_urls = {"https://example.com/0"}
+    stats = await _fake_database(conn, batch_size=2).save_categories(categories, TEST_RETAILER_ID)
+
+    # Only the savepoint of the failing batch is rolled back; the outer transaction commits
+    assert conn.rollbacks == 1
+    assert stats == {"saved": 1, "updated": 0, "skipped": 0, "errors": 2}
+    assert conn.fetch_calls == [[("Cat 2", "https://example.com/2", None)]]
+
+
+@pytest.mark.asyncio
+async def test_save_categories_copies_first_load(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("src.ai_agents.category_extractor.database._COPY_MIN_ROWS", 2)
+    categories = [
+        {"id": "a", "name": "Women", "url": "https://example.com/women", "depth": 0, "parent_id": None},
+        {"id": "b", "name": "Men", "url": "https://example.com/men", "depth": 0, "parent_id": None},
+        {"id": "c", "name": "Shoes", "url": "https://example.com/women/shoes", "depth": 1, "parent_id": "a"},
+        {"id": "d", "name": "Shirts", "url": "https://example.com/men/shirts", "depth": 1, "parent_id": "b"},
+        {"id": "e", "name": "Men again", "url": "https://example.com/men", "depth": 1, "parent_id": "a"},
+    ]
+    conn = FakeConnection()
+    stats = await _fake_database(conn).save_categories(categories, TEST_RETAILER_ID)
+
+    assert stats == {"saved": 5, "updated": 0, "skipped": 0, "errors": 0}
+    assert [[row["url"] for row in batch] for batch in conn.copy_calls] == [
+        ["https://example.com/women", "https://example.com/men"],
+        ["https://example.com/women/shoes", "https://example.com/men/shirts"],
+    ]
+    assert [row["parent_id"] for row in conn.copy_calls[1]] == [1000, 1001]
+    # A url already stored this run cannot be copied again, so it goes through the upsert
+    assert conn.fetch_calls == [[("Men again", "https://example.com/men", 1000)]]
+
+
+@pytest.mark.asyncio
+async def test_failed_copy_skips_children_instead_of_orphaning_them(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("src.ai_agents.category_extractor.database._COPY_MIN_ROWS", 2)
+    categories = [
+        {"id": "a", "name": "Women", "url": "https://example.com/women", "depth": 0, "parent_id": None},
+        {"id": "b", "name": "Men", "url": "https://example.com/men", "depth": 0, "parent_id": None},
+        {"id": "c", "name": "Shoes", "url": "https://example.com/women/shoes", "depth": 1, "parent_id": "a"},
+        {"id": "d", "name": "Boots", "url": "https://example.com/women/shoes/boots", "depth": 2, "parent_id": "c"},
+    ]
+    conn = FakeConnection()
+    conn.failing_urls = {"https://example.com/women"}
+    stats = await _fake_database(conn).save_categories(categories, TEST_RETAILER_ID)
+
+    assert conn.rollbacks == 1
+    assert stats == {"saved": 0, "updated": 0, "skipped": 0, "errors": 4}
+    assert conn.copy_calls == [] and conn.fetch_calls == []
+
+
+@pytest.mark.asyncio
+async def test_health_check_reuses_probe_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    probe = mock.MagicMock()
+    probe.is_closed.return_value = False
+    probe.fetchval = mock.AsyncMock(return_value=1)
+    probe.close = mock.AsyncMock()
+    connect = mock.AsyncMock(return_value=probe)
+    monkeypatch.setattr("asyncpg.connect", connect)
+
+    database = CategoryDatabase()
+    assert await database.health_check() is True
+    assert await database.health_check() is True
+    await database.disconnect()
+
+    connect.assert_awaited_once()
+    assert probe.fetchval.await_count == 2
+    probe.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_health_checks_share_probe_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    busy = False
+
+    async def fetchval(sql: str) -> int:
+        nonlocal busy
+        if busy:
+            raise RuntimeError("another operation is in progress")
+        busy = True
+        await asyncio.sleep(0.01)
+        busy = False
+        return 1
+
+    async def open_probe(**kwargs: Any):
+        await asyncio.sleep(0.01)
+        return probe
+
+    probe = mock.MagicMock()
+    probe.is_closed.return_value = False
+    probe.fetchval = mock.AsyncMock(side_effect=fetchval)
+    connect = mock.AsyncMock(side_effect=open_probe)
+    monkeypatch.setattr("asyncpg.connect", connect)
+
+    database = CategoryDatabase()
+    assert await asyncio.gather(database.health_check(), database.health_check()) == [True, True]
+
+    connect.assert_awaited_once()
+    assert probe.fetchval.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_save_categories_splits_subtrees_when_concurrent() -> None:
+    categories = [
+        {"id": "a", "name": "Women", "url": "https://example.com/women", "depth": 0, "parent_id": None},
+        {"id": "b", "name": "Men", "url": "https://example.com/men", "depth": 0, "parent_id": None},
+        {"id": "c", "name": "Shoes", "url": "https://example.com/women/shoes", "depth": 1, "parent_id": "a"},
+        {"id": "d", "name": "Shirts", "url": "https://example.com/men/shirts", "depth": 1, "parent_id": "b"},
+        {"id": "e", "name": "Boots", "url": "https://example.com/women/shoes/boots", "depth": 2, "parent_id": "c"},
+    ]
+    conn = FakeConnection()
+    stats = await _fake_database(conn, concurrency=2).save_categories(categories, TEST_RETAILER_ID)
+
+    assert stats["saved"] == 5
+    assert len(conn.prepared) == 3
+    assert conn.fetch_calls == [
+        [("Women", "https://example.com/women", None), ("Men", "https://example.com/men", None)],
+        [("Shoes", "https://example.com/women/shoes", 100)],
+        [("Boots", "https://example.com/women/shoes/boots", 200)],
+        [("Shirts", "https://example.com/men/shirts", 101)],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_connects_share_one_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = FakePool(FakeConnection())
+    database = CategoryDatabase()
+
+    async def create_pool() -> FakePool:
+        await asyncio.sleep(0)
+        return pool
+
+    create = mock.AsyncMock(side_effect=create_pool)
+    monkeypatch.setattr(database, "_create_pool", create)
+
+    await asyncio.gather(database.connect(), database.connect(), database.connect())
+
+    assert database.pool is pool
+    create.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_iter_categories_streams_through_cursor() -> None:
+    rows = [{"id": 1, "name": "Root"}, {"id": 2, "name": "Child"}]
+    conn = FakeConnection()
+    calls = []
+
+    async def cursor(sql: str, *args: Any, prefetch: int):
+        calls.append((args, prefetch))
+        for row in rows:
+            yield row
+
+    conn.cursor = cursor
+    database = _fake_database(conn)
+
+    streamed = [row async for row in database.iter_categories(TEST_RETAILER_ID, prefetch=50)]
+
+    assert streamed == rows
+    assert calls == [((TEST_RETAILER_ID,), 50)]
+
+
+@pytest.mark.asyncio
+async def test_get_categories_by_retailer_returns_dicts() -> None:
+    conn = FakeConnection()
+
+    class Record(tuple):
+        """Stands in for asyncpg.Record: keyed access, but not a dict."""
+
+        def keys(self):
+            return ["id", "name"]
+
+        def __getitem__(self, key):
+            return tuple.__getitem__(self, self.keys().index(key) if isinstance(key, str) else key)
+
+    async def fetch(sql: str, retailer_id: int):
+        return [Record((1, "Root"))]
+
+    conn.fetch = fetch
+    categories = await _fake_database(conn).get_categories_by_retailer(TEST_RETAILER_ID)
+
+    assert categories == [{"id": 1, "name": "Root"}]
+    assert type(categories[0]) is dict
+
+
+def test_jsonb_codec_round_trips() -> None:
+    payload = {"source": "blueprint", "depths": [0, 1, 2]}
+    encoded = _encode_jsonb(payload)
+    assert encoded[:1] == b"\x01"
+    assert _decode_jsonb(encoded) == payload
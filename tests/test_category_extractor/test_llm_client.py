@@ -0,0 +1,394 @@
+"""Tests for LLM client transport handling (no model invocation)."""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest import mock
+
+import httpx
+import openai
+import pytest
+
+from src.ai_agents.category_extractor.config import get_config
+from src.ai_agents.category_extractor import llm_client
+from src.ai_agents.category_extractor.errors import AnalysisError
+from src.ai_agents.category_extractor.llm_client import (
+    _PROMPT_PREFIX,
+    _data_url,
+    _image_media_type,
+    _read_json_object,
+    CircuitBreakerLLMClient,
+    OllamaLLMClient,
+    OpenAILLMClient,
+    RacingLLMClient,
+    create_llm_client,
+    shutdown_llm_clients,
+)
+
+_ANALYSIS = {"navigation_type": "sidebar", "selectors": {"category_links": "nav a"}, "confidence": 0.9}
+
+
+@pytest.mark.asyncio
+async def test_ollama_client_streams_over_one_http_client() -> None:
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        text = json.dumps(_ANALYSIS)
+        chunks = [
+            {"message": {"content": text[:10]}, "done": False},
+            {"message": {"content": text[10:]}, "done": True},
+        ]
+        return httpx.Response(200, content="\n".join(json.dumps(chunk) for chunk in chunks))
+
+    client = OllamaLLMClient(get_config())
+    client._http = httpx.AsyncClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    http = client.http
+
+    first = await client.analyze_page("https://example.com", b"jpeg", "<nav></nav>")
+    await client.analyze_page("https://example.com/women", b"jpeg", "<nav></nav>")
+
+    assert client.http is http
+    assert [request.url.path for request in requests] == ["/api/chat", "/api/chat"]
+    body = json.loads(requests[0].content)
+    assert body["stream"] is True
+    assert body["messages"][0] == {"role": "system", "content": _PROMPT_PREFIX}
+    assert requests[0].headers["content-type"] == "application/json"
+    assert first["selectors"] == _ANALYSIS["selectors"]
+
+    await client.aclose()
+    assert http.is_closed
+    assert client._http is None
+
+
+@pytest.mark.asyncio
+async def test_analyze_pages_bounds_concurrency_and_keeps_order() -> None:
+    active = 0
+    peak = 0
+
+    class SlowClient(OllamaLLMClient):
+        async def analyze_page(self, url: str, screenshot: bytes, html_snippet: str):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if url.endswith("broken"):
+                raise AnalysisError("bad page")
+            return {"url": url}
+
+    items = [(f"https://example.com/{name}", b"jpeg", "<nav></nav>") for name in ("a", "b", "broken", "c", "d")]
+    results = await SlowClient(get_config()).analyze_pages(items, concurrency=8)
+
+    assert peak == 2  # Ollama caps the requested concurrency
+    assert [result["url"] for result in results if isinstance(result, dict)] == [
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/c",
+        "https://example.com/d",
+    ]
+    assert isinstance(results[2], AnalysisError)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "```json\n" + json.dumps(_ANALYSIS) + "\n```",
+        "Here is the analysis: " + json.dumps(_ANALYSIS) + " Let me know if you need more.",
+    ],
+)
+def test_parse_response_extracts_json(content: str) -> None:
+    parsed = OllamaLLMClient(get_config())._parse_response(content, "https://example.com")
+
+    assert parsed["navigation_type"] == "sidebar"
+    assert parsed["confidence"] == 0.9
+
+
+def test_parse_response_rejects_text_without_json() -> None:
+    with pytest.raises(AnalysisError):
+        OllamaLLMClient(get_config())._parse_response("} no json here {", "https://example.com")
+
+
+@pytest.mark.asyncio
+async def test_read_json_object_ignores_braces_inside_strings() -> None:
+    async def pieces():
+        for piece in ['Sure: {"notes": ["a } b", "quote \\"{"], ', '"nested": {"x": 1}', "} extra }", "never read"]:
+            yield piece
+
+    assert await _read_json_object(pieces()) == 'Sure: {"notes": ["a } b", "quote \\"{"], "nested": {"x": 1}}'
+
+
+def test_prompt_starts_with_static_prefix() -> None:
+    client = OllamaLLMClient(get_config())
+    first = client._build_prompt("https://example.com", "<nav>a</nav>")
+    second = client._build_prompt("https://example.org", "<nav>b</nav>")
+
+    assert first.startswith(_PROMPT_PREFIX) and second.startswith(_PROMPT_PREFIX)
+    assert first[len(_PROMPT_PREFIX) :] == client._build_prompt_suffix("https://example.com", "<nav>a</nav>")
+
+
+def test_build_prompt_reuses_rendered_prompt() -> None:
+    client = OllamaLLMClient(get_config())
+    html = "<nav>" + "x" * 5000 + "</nav>"
+
+    first = client._build_prompt("https://example.com/cached", html)
+    assert client._build_prompt("https://example.com/cached", html + "<footer></footer>") is first
+    assert "truncated=true" in first
+
+
+@pytest.mark.asyncio
+async def test_racing_client_returns_first_success_and_cancels_rest() -> None:
+    cancelled = asyncio.Event()
+
+    class FailingClient(OllamaLLMClient):
+        async def analyze_page(self, url: str, screenshot: bytes, html_snippet: str):
+            raise AnalysisError("provider down")
+
+    class FastClient(OllamaLLMClient):
+        async def analyze_page(self, url: str, screenshot: bytes, html_snippet: str):
+            await asyncio.sleep(0.01)
+            return {"provider": "fast"}
+
+    class SlowClient(OllamaLLMClient):
+        async def analyze_page(self, url: str, screenshot: bytes, html_snippet: str):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    config = get_config()
+    racer = RacingLLMClient([FailingClient(config), SlowClient(config), FastClient(config)], config)
+
+    assert await racer.analyze_page("https://example.com", b"jpeg", "<nav></nav>") == {"provider": "fast"}
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    with pytest.raises(AnalysisError, match="provider down"):
+        await RacingLLMClient([FailingClient(config)], config).analyze_page("https://example.com", b"jpeg", "")
+
+
+def test_create_llm_client_races_extra_providers() -> None:
+    config = get_config().model_copy(update={"llm_provider": "ollama", "llm_race_providers": "openai, ollama"})
+
+    client = create_llm_client(config)
+
+    assert isinstance(client, RacingLLMClient)
+    assert [type(c.delegate) for c in client.clients] == [OllamaLLMClient, OpenAILLMClient]
+
+
+@pytest.mark.asyncio
+async def test_created_race_cancels_losing_provider(monkeypatch: pytest.MonkeyPatch) -> None:
+    cancelled = asyncio.Event()
+
+    class FastClient(OllamaLLMClient):
+        async def analyze_page(self, url: str, screenshot: bytes, html_snippet: str):
+            await asyncio.sleep(0.01)
+            return {"provider": "fast"}
+
+    class SlowClient(OllamaLLMClient):
+        async def analyze_page(self, url: str, screenshot: bytes, html_snippet: str):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return {"provider": "slow"}
+
+    monkeypatch.setattr(llm_client, "_CLIENT_CLASSES", {"ollama": FastClient, "openai": SlowClient})
+    await shutdown_llm_clients()
+    config = get_config().model_copy(update={"llm_provider": "ollama", "llm_race_providers": "openai"})
+    racer = create_llm_client(config)
+    slow = racer.clients[1]
+
+    assert await racer.analyze_page("https://example.com", b"jpeg", "<nav></nav>") == {"provider": "fast"}
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert slow._inflight == {} and not slow._waiters
+    await shutdown_llm_clients()
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_keeps_request_while_another_caller_waits() -> None:
+    config = get_config()
+    delegate = OllamaLLMClient(config)
+
+    async def analyze(url: str, screenshot: bytes, html_snippet: str):
+        await asyncio.sleep(0.02)
+        return {"url": url}
+
+    delegate.analyze_page = mock.AsyncMock(side_effect=analyze)
+    breaker = CircuitBreakerLLMClient(delegate, config)
+
+    impatient = asyncio.create_task(breaker.analyze_page("https://example.com", b"jpeg", ""))
+    patient = asyncio.create_task(breaker.analyze_page("https://example.com", b"jpeg", ""))
+    await asyncio.sleep(0)
+    impatient.cancel()
+
+    assert await patient == {"url": "https://example.com"}
+    assert impatient.cancelled()
+    assert delegate.analyze_page.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_retries_then_opens() -> None:
+    calls = []
+
+    class UnavailableClient(OllamaLLMClient):
+        async def analyze_page(self, url: str, screenshot: bytes, html_snippet: str):
+            calls.append(url)
+            request = httpx.Request("POST", "http://ollama.test/api/chat")
+            try:
+                raise httpx.HTTPStatusError("busy", request=request, response=httpx.Response(503, request=request))
+            except httpx.HTTPStatusError as e:
+                raise AnalysisError(f"Ollama HTTP error: {e}")
+
+    config = get_config().model_copy(update={"max_retries": 1, "retry_delay": 1})
+    breaker = CircuitBreakerLLMClient(UnavailableClient(config), config)
+
+    with pytest.raises(AnalysisError, match="HTTP error"):
+        await breaker.analyze_page("https://example.com", b"jpeg", "")
+    with pytest.raises(AnalysisError, match="circuit open"):
+        await breaker.analyze_page("https://example.com", b"jpeg", "")
+
+    assert len(calls) == 2  # one retry, then the open circuit short-circuits
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_does_not_retry_parse_errors() -> None:
+    config = get_config()
+    delegate = OllamaLLMClient(config)
+    delegate.analyze_page = mock.AsyncMock(side_effect=lambda *args: delegate._parse_response("no json", "u"))
+    breaker = CircuitBreakerLLMClient(delegate, config)
+
+    for _ in range(2):
+        with pytest.raises(AnalysisError, match="Failed to parse"):
+            await breaker.analyze_page("https://example.com", b"jpeg", "")
+    assert delegate.analyze_page.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_ollama_client_surfaces_streamed_errors() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=json.dumps({"error": "model not found"}))
+
+    client = OllamaLLMClient(get_config())
+    client._http = httpx.AsyncClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+
+    with pytest.raises(AnalysisError, match="model not found"):
+        await client.analyze_page("https://example.com", b"jpeg", "<nav></nav>")
+    await client.aclose()
+
+
+def test_timestamp_is_utc_and_reused_within_a_second() -> None:
+    client = OllamaLLMClient(get_config())
+    with mock.patch("src.ai_agents.category_extractor.llm_client.time.time", side_effect=[100.1, 100.9, 101.0]):
+        first, second, third = (client._get_timestamp() for _ in range(3))
+
+    assert first == second == "1970-01-01T00:01:40+00:00"
+    assert third == "1970-01-01T00:01:41+00:00"
+
+
+def test_create_llm_client_shares_clients_per_settings() -> None:
+    config = get_config().model_copy(update={"llm_provider": "ollama", "llm_race_providers": ""})
+
+    assert create_llm_client(config) is create_llm_client(config.model_copy())
+    assert create_llm_client(config) is not create_llm_client(config.model_copy(update={"ollama_model": "tiny"}))
+
+
+@pytest.mark.asyncio
+async def test_shutdown_closes_and_forgets_shared_clients() -> None:
+    config = get_config().model_copy(update={"llm_provider": "ollama", "llm_race_providers": ""})
+    client = create_llm_client(config)
+    http = client.delegate.http
+
+    await shutdown_llm_clients()
+
+    assert http.is_closed
+    assert create_llm_client(config) is not client
+    await shutdown_llm_clients()
+
+
+def test_image_media_type_detects_png_placeholder() -> None:
+    assert _image_media_type(b"\xff\xd8\xff\xe0") == "image/jpeg"
+    assert _image_media_type(b"\x89PNG\r\n\x1a\n") == "image/png"
+    assert _image_media_type(memoryview(b"\x89PNG\r\n\x1a\n")) == "image/png"
+    assert _data_url(memoryview(b"\xff\xd8\xff")) == "data:image/jpeg;base64,/9j/"
+
+
+@pytest.mark.asyncio
+async def test_openai_compatible_clients_share_request_path() -> None:
+    config = get_config()
+    client = OpenAILLMClient(config)
+    text = json.dumps(_ANALYSIS)
+    sent = []
+
+    class FakeStream:
+        close = mock.AsyncMock()
+
+        async def __aiter__(self):
+            for piece in ["```json\n", text[:15], text[15:], "\n```", " trailing prose"]:
+                chunk = mock.MagicMock()
+                chunk.choices[0].delta.content = piece
+                sent.append(piece)
+                yield chunk
+
+    stream = FakeStream()
+    client._client = mock.MagicMock()
+    client._client.chat.completions.create = mock.AsyncMock(return_value=stream)
+
+    analysis = await client.analyze_page("https://example.com", b"\xff\xd8\xff", "<nav></nav>")
+
+    assert analysis["navigation_type"] == "sidebar"
+    # The stream is closed as soon as the JSON object ends
+    assert sent[-1] == text[15:]
+    stream.close.assert_awaited_once()
+    kwargs = client._client.chat.completions.create.await_args.kwargs
+    assert kwargs["model"] == config.openai_model
+    assert kwargs["stream"] is True
+    assert kwargs["messages"][0] == {"role": "system", "content": _PROMPT_PREFIX}
+    assert kwargs["messages"][1]["content"][1]["image_url"]["url"] == "data:image/jpeg;base64,/9j/"
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_coalesces_identical_requests() -> None:
+    config = get_config()
+    delegate = OllamaLLMClient(config)
+
+    async def analyze(url: str, screenshot: bytes, html_snippet: str):
+        await asyncio.sleep(0.01)
+        return {"url": url, "selectors": {"category_links": "nav a"}}
+
+    delegate.analyze_page = mock.AsyncMock(side_effect=analyze)
+    breaker = CircuitBreakerLLMClient(delegate, config)
+
+    results = await asyncio.gather(
+        breaker.analyze_page("https://example.com", b"jpeg", "<nav></nav>"),
+        breaker.analyze_page("https://example.com", b"jpeg", "<nav></nav>"),
+        breaker.analyze_page("https://example.com/other", b"jpeg", "<nav></nav>"),
+    )
+
+    assert [result["url"] for result in results] == [
+        "https://example.com",
+        "https://example.com",
+        "https://example.com/other",
+    ]
+    results[0]["selectors"]["category_links"] = None
+    assert results[1]["selectors"] == {"category_links": "nav a"}
+    assert delegate.analyze_page.await_count == 2
+    assert breaker._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_sdk_clients_share_http2_pool_and_bound_requests() -> None:
+    config = get_config().model_copy(update={"openai_api_key": "sk-test", "llm_max_concurrency": 4})
+    client = OpenAILLMClient(config)
+    http = client.client._client
+
+    assert isinstance(http, openai.DefaultAsyncHttpxClient)
+    # The SDK's own timeout is kept instead of httpx's bare defaults
+    assert http.timeout == openai.DEFAULT_TIMEOUT
+    assert client._request_slots._value == 4
+    assert OllamaLLMClient(config)._request_slots._value == OllamaLLMClient.max_parallel_requests
+
+    await client.aclose()
+    assert http.is_closed
+    assert client._client is None
@@ -21,8 +21,7 @@ class DummyAgent:
         self.site_url = "https://example.com"
         self.state = {}
         self.db = DummyDB()
-        self.config = reload_config()
-        self.config.blueprint_dir = str(tmp_path)
+        self.config = reload_config().model_copy(update={"blueprint_dir": str(tmp_path)})
 
 
 @pytest.mark.asyncio
@@ -52,3 +51,5 @@ async def test_generate_blueprint_writes_file(tmp_path: Path, monkeypatch: pytes
     data = json.loads(Path(path).read_text(encoding="utf-8"))
     assert data["metadata"]["retailer_id"] == agent.retailer_id
     assert agent.state["blueprint_path"] == path
+    assert data["extraction_stats"]["categories_by_depth"] == {"0": 1, "1": 1}
+    assert data["validation_rules"]["max_depth"] == data["extraction_stats"]["max_depth"] == 1
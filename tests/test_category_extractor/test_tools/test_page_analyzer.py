@@ -1,10 +1,13 @@
 """Smoke tests for PageAnalyzerTool structure (no Bedrock invocation)."""
 from __future__ import annotations
 
+from unittest import mock
+
 import pytest
 
 from src.ai_agents.category_extractor.errors import AnalysisError
 from src.ai_agents.category_extractor.tools.page_analyzer import PageAnalyzerTool
+from src.ai_agents.category_extractor.utils.response_cache import ResponseCache
 
 
 class DummyAgent:
@@ -19,3 +22,86 @@ async def test_analyzer_requires_page() -> None:
     analyzer = PageAnalyzerTool(DummyAgent())
     with pytest.raises(AnalysisError):
         await analyzer.analyze("https://example.com")
+
+
+@pytest.mark.asyncio
+async def test_analyzer_reuses_cached_analysis(tmp_path) -> None:
+    analyzer = PageAnalyzerTool(DummyAgent())
+    analyzer.cache = ResponseCache(tmp_path, ttl_seconds=60)
+    analyzer.llm_client = mock.MagicMock()
+    analyzer.llm_client._build_prompt.return_value = "prompt"
+    analyzer.llm_client.analyze_page = mock.AsyncMock(return_value={"navigation_type": "sidebar"})
+
+    first = await analyzer._analyze_with_cache("https://example.com", b"jpeg", "<nav></nav>")
+    second = await analyzer._analyze_with_cache("https://example.com", b"jpeg", "<nav></nav>")
+
+    assert first == second == {"navigation_type": "sidebar"}
+    analyzer.llm_client.analyze_page.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_analyzer_routes_small_pages_to_analyzer_model() -> None:
+    analyzer = PageAnalyzerTool(DummyAgent())
+    analyzer.cache = None
+    analyzer.config = analyzer.config.model_copy(update={"analyzer_model": "tiny", "analyzer_max_html_chars": 20})
+    analyzer.llm_client = mock.MagicMock()
+    analyzer.llm_client.analyze_page = mock.AsyncMock(return_value={"model": "main"})
+    analyzer.light_llm_client = mock.MagicMock()
+    analyzer.light_llm_client.analyze_page = mock.AsyncMock(return_value={"model": "tiny"})
+
+    small = await analyzer._analyze_with_cache("https://example.com", b"jpeg", "<nav></nav>")
+    large = await analyzer._analyze_with_cache("https://example.com", b"jpeg", "<nav>" + "x" * 50 + "</nav>")
+
+    assert small == {"model": "tiny"}
+    assert large == {"model": "main"}
+
+
+@pytest.mark.asyncio
+async def test_analyzer_routes_on_prompt_sized_html_and_warms_both_models() -> None:
+    analyzer = PageAnalyzerTool(DummyAgent())
+    analyzer.config = analyzer.config.model_copy(update={"analyzer_model": "tiny", "analyzer_max_html_chars": 5000})
+    analyzer.llm_client = mock.MagicMock(warm_up=mock.AsyncMock())
+    analyzer.light_llm_client = mock.MagicMock(warm_up=mock.AsyncMock())
+
+    # The prompt only carries the first 4000 chars, so a longer page still fits the threshold
+    assert analyzer._select_client("x" * 10000) == (analyzer.light_llm_client, "tiny")
+
+    await analyzer.warm_up()
+    analyzer.llm_client.warm_up.assert_awaited_once()
+    analyzer.light_llm_client.warm_up.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_analyzer_drops_selectors_missing_from_page() -> None:
+    analyzer = PageAnalyzerTool(DummyAgent())
+    analyzer.cache = None
+    counts = {"nav": 1, ".invented a": 0}
+    analyzer.agent.page = mock.MagicMock()
+    analyzer.agent.page.locator.side_effect = lambda selector: mock.MagicMock(
+        count=mock.AsyncMock(return_value=counts[selector])
+    )
+    analyzer.llm_client = mock.MagicMock()
+    analyzer.llm_client.analyze_page = mock.AsyncMock(
+        return_value={
+            "navigation_type": "top_nav",
+            "selectors": {"nav_container": "nav", "category_links": ".invented a"},
+            "confidence": 0.8,
+        }
+    )
+
+    analysis = await analyzer._analyze_with_cache("https://example.com", b"jpeg", "<nav><a href='/w'>W</a></nav>")
+
+    assert analysis["selectors"] == {"nav_container": "nav", "category_links": None}
+    assert analysis["evidence"]["counts"] == {"nav_container": 1, "category_links": 0}
+    assert analysis["confidence"] == 0.4
+
+
+@pytest.mark.asyncio
+async def test_analyzer_captures_compact_jpeg_screenshots() -> None:
+    page = mock.MagicMock()
+    page.screenshot = mock.AsyncMock(return_value=b"\xff\xd8\xff\xe0jpeg")
+
+    screenshot = await PageAnalyzerTool(DummyAgent())._capture_screenshot(page)
+
+    assert screenshot == b"\xff\xd8\xff\xe0jpeg"
+    page.screenshot.assert_awaited_once_with(full_page=True, type="jpeg", quality=85, scale="css")
@@ -20,3 +20,8 @@ def test_get_logger_binds_retailer() -> None:
 
     assert bound_msg, "Logger sink should capture output"
     assert "42" in bound_msg[0], f"Expected '42' in {bound_msg[0]}"
+
+
+def test_get_logger_reuses_bound_logger() -> None:
+    assert get_logger(7) is get_logger(7)
+    assert get_logger(7) is not get_logger(8)
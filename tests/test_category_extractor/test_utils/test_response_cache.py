@@ -0,0 +1,27 @@
+"""Tests for the LLM response cache."""
+from __future__ import annotations
+
+from src.ai_agents.category_extractor.utils.response_cache import ResponseCache, cache_key
+
+
+def test_response_cache_serves_warm_hits_from_memory(tmp_path) -> None:
+    cache = ResponseCache(tmp_path, ttl_seconds=60)
+    key = cache_key("ollama", "llama", "https://example.com", "prompt")
+    cache.set(key, {"navigation_type": "sidebar"})
+
+    for path in tmp_path.iterdir():
+        path.unlink()
+    first = cache.get(key)
+    first["navigation_type"] = "mutated"
+
+    assert cache.get(key) == {"navigation_type": "sidebar"}
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path) -> None:
+    cache = ResponseCache(tmp_path, ttl_seconds=60, max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.set(name, {"name": name})
+
+    assert list(cache._memory) == ["b", "c"]
+    assert cache.get("a") == {"name": "a"}  # still on disk
+    assert list(cache._memory) == ["c", "a"]
@@ -0,0 +1,51 @@
+"""Tests for live selector checks."""
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+
+from src.ai_agents.category_extractor.utils.selector_check import count_selector_matches
+
+
+def _page(counts):
+    def locator(selector):
+        result = counts[selector]
+        if isinstance(result, Exception):
+            return mock.MagicMock(count=mock.AsyncMock(side_effect=result))
+        return mock.MagicMock(count=mock.AsyncMock(return_value=result))
+
+    return mock.MagicMock(locator=mock.MagicMock(side_effect=locator))
+
+
+@pytest.mark.asyncio
+async def test_count_selector_matches() -> None:
+    page = _page(
+        {
+            "nav.main": 1,
+            "nav.main a.cat": 2,
+            ".mega-menu": 0,
+            "a:has-text('Women')": 1,
+            "nav[[": ValueError("invalid selector"),
+        }
+    )
+
+    counts = await count_selector_matches(
+        page,
+        {
+            "nav_container": "nav.main",
+            "category_links": "nav.main a.cat",
+            "flyout_panel": ".mega-menu",
+            "subcategory_list": None,
+            "top_level_items": "a:has-text('Women')",
+            "breadcrumbs": "nav[[",
+        },
+    )
+
+    assert counts == {
+        "nav_container": 1,
+        "category_links": 2,
+        "flyout_panel": 0,
+        "top_level_items": 1,
+        "breadcrumbs": None,
+    }